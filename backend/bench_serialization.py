@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the discover endpoint.
+
+Compares the per-request CPU cost of answering a discover cache hit:
+  before - the cached dict returned as-is, so FastAPI runs jsonable_encoder
+           and JSONResponse (stdlib json) on every request
+  after  - the CachedPayload stored in the cache entry is sent as bytes
+           (plain and gzip, the encoding built once and reused)
+plus the one-off cost of building a CachedPayload on a cache miss.
+
+Usage:  python bench_serialization.py [--sections 20] [--items 50] [--requests 200]
+"""
+
+import argparse
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+import server
+
+
+def make_discover_payload(sections: int, items: int) -> dict:
+    """A discover result shaped like get_discover's, with Cinemeta-like metas"""
+    def meta(kind: str, n: int) -> dict:
+        return {
+            "id": f"tt{1000000 + n}",
+            "imdb_id": f"tt{1000000 + n}",
+            "type": kind,
+            "name": f"Some {kind.title()} Title {n}",
+            "poster": f"https://images.metahub.space/poster/medium/tt{1000000 + n}/img",
+            "background": f"https://images.metahub.space/background/medium/tt{1000000 + n}/img",
+            "logo": f"https://images.metahub.space/logo/medium/tt{1000000 + n}/img",
+            "description": "A reasonably long synopsis of the title, as Cinemeta returns it. " * 3,
+            "releaseInfo": str(1990 + n % 35),
+            "imdbRating": f"{5 + (n % 50) / 10:.1f}",
+            "genres": ["Drama", "Thriller", "Mystery"],
+            "cast": ["Actor One", "Actor Two", "Actor Three", "Actor Four"],
+            "runtime": "118 min",
+        }
+
+    services = {}
+    for s in range(sections):
+        services[f"Service {s}"] = {
+            "movies": [meta("movie", s * items * 2 + i) for i in range(items)],
+            "series": [meta("series", s * items * 2 + items + i) for i in range(items)],
+            "channels": [],
+        }
+    return {"continueWatching": [], "services": services}
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def cpu_per_call(fn, n: int) -> float:
+    """Mean CPU milliseconds per call over n calls"""
+    fn()  # warm up
+    start = time.process_time()
+    for _ in range(n):
+        fn()
+    return (time.process_time() - start) * 1000 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=20, help="discover sections")
+    parser.add_argument("--items", type=int, default=50, help="movies and series per section")
+    parser.add_argument("--requests", type=int, default=200, help="requests per measurement")
+    args = parser.parse_args()
+
+    result = make_discover_payload(args.sections, args.items)
+    payload = server.CachedPayload(result)
+    plain = make_request({})
+    gzipped = make_request({"Accept-Encoding": "gzip"})
+
+    print(f"Discover payload: {len(payload.body) / 1024:.0f} KB JSON, "
+          f"{len(payload.encoded('gzip')) / 1024:.0f} KB gzip, "
+          f"orjson={'yes' if server.ORJSON_AVAILABLE else 'no'}, brotli={'yes' if server.BROTLI_AVAILABLE else 'no'}")
+    print()
+
+    before = cpu_per_call(lambda: JSONResponse(jsonable_encoder(result)).body, args.requests)
+    fill = cpu_per_call(lambda: server.CachedPayload(result), args.requests)
+    after_plain = cpu_per_call(lambda: server.payload_response(plain, payload), args.requests)
+    after_gzip = cpu_per_call(lambda: server.payload_response(gzipped, payload), args.requests)
+
+    print(f"{'cache hit, before (jsonable_encoder + json)':<46}{before:>10.3f} ms/request")
+    print(f"{'cache hit, after (cached bytes)':<46}{after_plain:>10.3f} ms/request")
+    print(f"{'cache hit, after (cached gzip bytes)':<46}{after_gzip:>10.3f} ms/request")
+    print(f"{'cache fill (serialize + hash, once per TTL)':<46}{fill:>10.3f} ms")
+    print()
+    print(f"Cache-hit speedup: {before / max(after_plain, 1e-6):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
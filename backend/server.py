@@ -1,9 +1,13 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse, Response, FileResponse
+from fastapi.responses import StreamingResponse, Response, FileResponse, JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
 import logging
 from pathlib import Path
@@ -12,16 +16,26 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
 import hashlib
+import re
+import gzip
+import json
+import sys
 import jwt
 import httpx
 import asyncio
+from collections import OrderedDict
 try:
-    import libtorrent as lt
-    LIBTORRENT_AVAILABLE = True
+    import brotli
+    BROTLI_AVAILABLE = True
 except ImportError:
-    lt = None
-    LIBTORRENT_AVAILABLE = False
-    logging.warning("libtorrent not available - streaming via torrent-stream server only")
+    brotli = None
+    BROTLI_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
 import threading
 import time
 import tempfile
@@ -30,6 +44,11 @@ import subprocess
 import fcntl  # V178A_LEADER_LOCK — flock-based worker leader election
 import signal
 import atexit
+from torrent_engine import TorrentEngineProxy, ENGINE_SOCKET, engine_pid
+from torrent_streaming import (
+    lt, LIBTORRENT_AVAILABLE, TorrentStreamer, TORRENT_CACHE_DIR, STREAM_SEEK_READER_TTL, load_torrent_metadata,
+    alert_pump, admission_controller, resume_saver, piece_scheduler, periodic_cleanup,
+)
 
 ROOT_DIR = Path(__file__).parent
 
@@ -46,6 +65,13 @@ JWT_ALGORITHM = "HS256"
 _discover_cache: Dict[str, Any] = {}  # {user_id: {"data": ..., "expires": datetime}}
 DISCOVER_CACHE_TTL = 300  # 5 minutes
 
+# Per-show (EZTV) and per-season (ApiBay) torrent indexes keyed by (season, episode).
+# Shared by every user and every episode of the show so a binge is one scrape, not N.
+_episode_index_cache: Dict[str, Any] = {}  # {key: {"data": index, "expires": datetime}}
+_episode_index_inflight: Dict[str, asyncio.Task] = {}
+EPISODE_INDEX_TTL = 900  # 15 minutes
+EPISODE_INDEX_MAX_ENTRIES = 500
+
 # Shared HTTP client for external API calls (reuse connections)
 _shared_http_client: Optional[httpx.AsyncClient] = None
 
@@ -61,7 +87,11 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'privastream')]
 
 # Create the main app
-app = FastAPI(title="PrivastreamCinema API")
+# orjson (when installed) also serializes every plain-dict response
+app = FastAPI(
+    title="PrivastreamCinema API",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -150,536 +180,18 @@ FALLBACK_MANIFESTS = {
 }
 
 # ==================== TORRENT STREAMING SERVER ====================
-# This provides Stremio-like torrent streaming capabilities
-
-class TorrentStreamer:
-    """Handles torrent downloading and HTTP streaming like Stremio - OPTIMIZED FOR K8s (HTTP trackers only)"""
-    MAX_SESSIONS = 3  # Keep 3 active torrents - allows switching between streams
-    
-    def __init__(self):
-        self.sessions = {}  # infoHash -> session data
-        self.download_dir = tempfile.mkdtemp(prefix="privastream_")
-        # MASSIVE HTTP/HTTPS tracker list - UDP is blocked in K8s
-        # More trackers = more peers discovered = faster playback
-        self.trackers = [
-            # === HIGH-RELIABILITY HTTP TRACKERS (verified 2026) ===
-            "http://tracker.opentrackr.org:1337/announce",
-            "http://tracker.bt4g.com:2095/announce",
-            "http://tracker2.dler.org:80/announce",
-            "http://tracker.renfei.net:8080/announce",
-            "http://tracker.tritan.gg:8080/announce",
-            "http://tracker.sbsub.com:2710/announce",
-            "http://tracker.mywaifu.best:6969/announce",
-            "http://tracker.moxing.party:6969/announce",
-            "http://tracker.ipv6tracker.org:80/announce",
-            "http://tracker.bz:80/announce",
-            "http://tracker.bittor.pw:1337/announce",
-            "http://open.trackerlist.xyz:80/announce",
-            "http://open.acgtracker.com:1096/announce",
-            "http://bvarf.tracker.sh:2086/announce",
-            "http://bt1.xxxxbt.cc:6969/announce",
-            "http://tracker.ghostchu-services.top:80/announce",
-            "http://tracker.dler.org:6969/announce",
-            "http://tr.nyacat.pw:80/announce",
-            "http://1337.abcvg.info:80/announce",
-            "http://wepzone.net:6969/announce",
-            "http://tracker.wepzone.net:6969/announce",
-            "http://tracker.qu.ax:6969/announce",
-            "http://tracker.darkness.services:6969/announce",
-            "http://bittorrent-tracker.e-n-c-r-y-p-t.net:1337/announce",
-            "http://www.genesis-sp.org:2710/announce",
-            "http://tracker.skyts.net:6969/announce",
-            "http://tr.highstar.shop:80/announce",
-            "http://tracker.dhitechnical.com:6969/announce",
-            "http://lucke.fenesisu.moe:6969/announce",
-            # === ADDITIONAL HTTP TRACKERS (expanded for max peer coverage) ===
-            "http://echostar.ddnsfree.com:8080/announce",
-            "http://tracker.exe.in.th:6969/announce",
-            "http://ipv4.rer.lol:2710/announce",
-            "http://retracker.joxnet.ru:80/announce",
-            "http://fosstorrents.com:6969/announce",
-            "http://retracker.sevstar.net:2710/announce",
-            "http://buny.uk:6969/announce",
-            "http://torrenttracker.nwc.acsalaska.net:6969/announce",
-            "http://tracker.gbitt.info:80/announce",
-            "http://reisub.nsupdate.info:6969/announce",
-            "http://filetracker.xyz:11451/announce",
-            "http://tracker1.itzmx.com:8080/announce",
-            "http://tracker.xn--djrq4gl4hvoi.top:80/announce",
-            "http://107.189.10.20.sslip.io:7777/announce",
-            # === HTTPS TRACKERS (TLS encrypted, reliable) ===
-            "https://tracker.zhuqiy.com:443/announce",
-            "https://tracker.pmman.tech:443/announce",
-            "https://tracker.moeblog.cn:443/announce",
-            "https://tracker.bt4g.com:443/announce",
-            "https://tr.zukizuki.org:443/announce",
-            "https://tracker.ghostchu-services.top:443/announce",
-            "https://tr.nyacat.pw:443/announce",
-            "https://t.213891.xyz:443/announce",
-            "https://shahidrazi.online:443/announce",
-            "https://tracker.nekomi.cn:443/announce",
-            "https://tracker.cyber-hub.net:443/announce",
-            "https://bittorrent.gongt.net:443/announce",
-            "https://tracker.mlsub.net:443/announce",
-            # === UDP TRACKERS (DHT now enabled - these may work) ===
-            "udp://tracker.opentrackr.org:1337/announce",
-            "udp://open.tracker.cl:1337/announce",
-            "udp://tracker.openbittorrent.com:6969/announce",
-            "udp://open.stealth.si:80/announce",
-            "udp://tracker.torrent.eu.org:451/announce",
-            "udp://exodus.desync.com:6969/announce",
-            "udp://tracker.tiny-vps.com:6969/announce",
-            "udp://tracker.moeking.me:6969/announce",
-            "udp://explodie.org:6969/announce",
-            "udp://tracker.pomf.se:80/announce",
-            "udp://tracker.leechers-paradise.org:6969/announce",
-            "udp://tracker.coppersurfer.tk:6969/announce",
-            "udp://9.rarbg.to:2710/announce",
-        ]
-        logger.info(f"TorrentStreamer initialized with {len(self.trackers)} HTTP trackers. Download dir: {self.download_dir}")
-        
-        self.lt_session = None
-        if LIBTORRENT_AVAILABLE:
-            # Create ONE shared libtorrent session - optimized for K8s (TCP ONLY)
-            settings = {
-                'listen_interfaces': '0.0.0.0:6881,[::]:6881,0.0.0.0:6891,[::]:6891',
-                'enable_dht': True,
-                'enable_lsd': True,
-                'enable_upnp': False,
-                'enable_natpmp': False,
-                'enable_outgoing_tcp': True,
-                'enable_incoming_tcp': True,
-                'enable_outgoing_utp': True,
-                'enable_incoming_utp': True,
-                'dht_bootstrap_nodes': 'router.bittorrent.com:6881,router.utorrent.com:6881,dht.transmissionbt.com:6881,dht.aelitis.com:6881,router.bitcomet.com:6881,dht.libtorrent.org:25401',
-                'announce_to_all_trackers': True,
-                'announce_to_all_tiers': True,
-                'tracker_completion_timeout': 30,
-                'tracker_receive_timeout': 10,
-                'stop_tracker_timeout': 1,
-                'min_announce_interval': 30,
-                'connection_speed': 500,
-                'connections_limit': 2000,
-                'download_rate_limit': 0,
-                'upload_rate_limit': 2 * 1024 * 1024,
-                'unchoke_slots_limit': 64,
-                'max_peerlist_size': 10000,
-                'peer_connect_timeout': 5,
-                'handshake_timeout': 5,
-                'torrent_connect_boost': 200,
-                'peer_timeout': 30,
-                'inactivity_timeout': 30,
-                'request_timeout': 10,
-                'cache_size': 4096,
-                'disk_io_read_mode': 0,
-                'disk_io_write_mode': 0,
-                'aio_threads': 8,
-                'request_queue_time': 3,
-                'max_out_request_queue': 2000,
-                'whole_pieces_threshold': 5,
-                'max_allowed_in_request_queue': 4000,
-                'send_buffer_watermark': 1024 * 1024,
-                'send_buffer_watermark_factor': 200,
-                'recv_socket_buffer_size': 2 * 1024 * 1024,
-                'send_socket_buffer_size': 2 * 1024 * 1024,
-                'mixed_mode_algorithm': 0,
-                'rate_limit_ip_overhead': False,
-                'allow_multiple_connections_per_ip': True,
-                'seed_choking_algorithm': 1,
-                'choking_algorithm': 1,
-                'max_rejects': 10,
-                'smooth_connects': False,
-                'always_send_user_agent': True,
-                'no_connect_privileged_ports': False,
-            }
-            self.lt_session = lt.session(settings)
-            logger.info("Shared libtorrent session started (DHT+TCP+uTP enabled, full peer discovery)")
-        else:
-            logger.warning("libtorrent not available - streaming via torrent-stream server only")
-    
-    def _evict_oldest(self):
-        """Remove the oldest session to make room for new ones"""
-        if len(self.sessions) >= self.MAX_SESSIONS:
-            oldest_hash = min(self.sessions.keys(), key=lambda k: self.sessions[k]['created'])
-            logger.info(f"Evicting oldest torrent session: {oldest_hash}")
-            self.cleanup_session(oldest_hash)
-            # Also do a disk cleanup
-            self._cleanup_disk()
-    
-    def get_session(self, info_hash: str, extra_trackers: list = None):
-        """Get or create a torrent handle using the shared session"""
-        info_hash = info_hash.lower()
-        
-        if not LIBTORRENT_AVAILABLE or self.lt_session is None:
-            # Return a stub session when libtorrent not available
-            if info_hash not in self.sessions:
-                self.sessions[info_hash] = {
-                    'session': None,
-                    'handle': None,
-                    'created': time.time(),
-                    'video_file': None,
-                    'video_path': None,
-                    'save_path': self.download_dir,
-                }
-            return self.sessions[info_hash]
-        
-        if info_hash in self.sessions and self.sessions[info_hash].get('handle'):
-            # Add extra trackers to existing session if provided
-            if extra_trackers:
-                handle = self.sessions[info_hash]['handle']
-                if handle.is_valid():
-                    for tracker_url in extra_trackers:
-                        if tracker_url.startswith('http') or tracker_url.startswith('udp'):
-                            try:
-                                handle.add_tracker({'url': tracker_url, 'tier': 0})
-                            except:
-                                pass
-                    handle.force_reannounce()
-            return self.sessions[info_hash]
-        
-        # Evict oldest if at max capacity
-        self._evict_oldest()
-        
-        # Build magnet URI with ALL trackers (our list + Torrentio's trackers)
-        all_trackers = list(self.trackers)
-        if extra_trackers:
-            for t in extra_trackers:
-                if (t.startswith('http') or t.startswith('udp')) and t not in all_trackers:
-                    all_trackers.append(t)
-        
-        magnet = f"magnet:?xt=urn:btih:{info_hash}"
-        for tracker in all_trackers:
-            magnet += f"&tr={tracker}"
-        
-        logger.info(f"Adding torrent {info_hash} with {len(all_trackers)} trackers (HTTP+UDP)")
-        
-        # Use the modern API (parse_magnet_uri + add_torrent)
-        params = lt.parse_magnet_uri(magnet)
-        params.save_path = self.download_dir
-        
-        handle = self.lt_session.add_torrent(params)
-        # Sequential download for streaming
-        handle.set_flags(lt.torrent_flags.sequential_download)
-        
-        # Force immediate announce to all trackers for fastest peer discovery
-        handle.force_reannounce(0)
-        
-        self.sessions[info_hash] = {
-            'session': self.lt_session,
-            'handle': handle,
-            'created': time.time(),
-            'video_file': None,
-            'video_path': None,
-            'save_path': self.download_dir,
-        }
-        
-        logger.info(f"Added torrent {info_hash} to shared session with force-reannounce")
-        return self.sessions[info_hash]
-    
-    def get_status(self, info_hash: str) -> dict:
-        """Get download status for a torrent"""
-        info_hash = info_hash.lower()
-        
-        if info_hash not in self.sessions:
-            return {"status": "not_found"}
-        
-        data = self.sessions[info_hash]
-        handle = data.get('handle')
-        
-        if not LIBTORRENT_AVAILABLE or handle is None:
-            # When libtorrent is not available, return minimal status
-            # The torrent-stream server handles the actual streaming
-            return {
-                "status": "delegated",
-                "progress": 0,
-                "peers": 0,
-                "download_rate": 0,
-                "ready": False,
-                "engine": "torrent-stream-only"
-            }
-        
-        if not handle.is_valid():
-            return {"status": "invalid"}
-        
-        s = handle.status()
-        
-        # Check if we have metadata
-        if not handle.has_metadata():
-            return {
-                "status": "downloading_metadata",
-                "progress": 0,
-                "peers": s.num_peers,
-                "download_rate": s.download_rate,
-            }
-        
-        # Find video file if not already found
-        if not data['video_file']:
-            ti = handle.get_torrent_info()
-            files = ti.files()
-            
-            # Collect all video files, categorized by format preference
-            # MP4/M4V are preferred (best Android TV compatibility)
-            # MKV works but may have codec issues on some TV hardware decoders
-            mp4_videos = []  # .mp4, .m4v - best compatibility
-            other_videos = []  # .mkv, .avi, .webm, .mov, .ts
-            
-            for i in range(files.num_files()):
-                file_path = files.file_path(i)
-                file_size = files.file_size(i)
-                
-                # Check if it's a video file
-                if any(file_path.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi', '.webm', '.mov', '.m4v', '.ts']):
-                    video_info = {
-                        'index': i,
-                        'path': file_path,
-                        'size': file_size,
-                    }
-                    if file_path.lower().endswith('.mp4') or file_path.lower().endswith('.m4v'):
-                        mp4_videos.append(video_info)
-                    else:
-                        other_videos.append(video_info)
-            
-            # Pick the largest MP4 first, then largest MKV/other as fallback
-            # Android TV hardware decoders handle MP4 containers much better
-            largest_video = None
-            if mp4_videos:
-                largest_video = max(mp4_videos, key=lambda v: v['size'])
-                logger.info(f"Selected MP4 video (Android TV preferred): {largest_video['path']}")
-            elif other_videos:
-                largest_video = max(other_videos, key=lambda v: v['size'])
-                logger.info(f"No MP4 found, using: {largest_video['path']}")
-            
-            largest_size = largest_video['size'] if largest_video else 0
-            
-            if largest_video:
-                data['video_file'] = largest_video
-                data['video_path'] = os.path.join(self.download_dir, largest_video['path'])
-                
-                # ===== STREAMING-OPTIMIZED PIECE PRIORITIZATION =====
-                num_pieces = ti.num_pieces()
-                piece_length = ti.piece_length()
-                
-                # Calculate piece range for video file
-                file_offset = files.file_offset(largest_video['index'])
-                start_piece = file_offset // piece_length
-                end_piece = (file_offset + largest_video['size']) // piece_length
-                video_pieces = end_piece - start_piece + 1
-                
-                # Set priorities - 0 = don't download, 7 = highest
-                priorities = [0] * num_pieces  # Don't download non-video files
-                
-                # Calculate how many pieces we need for fast start (aim for ~3-5MB)
-                # This is enough for ffmpeg to analyze the file and start transcoding
-                bytes_for_header = 5 * 1024 * 1024  # 5MB header
-                header_pieces = max(20, min(bytes_for_header // piece_length, video_pieces // 4))
-                
-                # PRIORITY STRATEGY FOR STREAMING:
-                # 1. First ~5MB (header/moov atom): CRITICAL (priority 7)
-                # 2. Next ~10MB: HIGH (priority 6) - for buffer
-                # 3. Last 2MB: CRITICAL (priority 7) - ExoPlayer reads end for moov atom!
-                # 4. Rest of video: NORMAL (priority 1) - sequential download handles this
-                
-                # Set base priority for all video pieces
-                for i in range(start_piece, end_piece + 1):
-                    priorities[i] = 1
-                
-                # CRITICAL: First header_pieces get highest priority
-                for i in range(start_piece, min(start_piece + header_pieces, end_piece + 1)):
-                    priorities[i] = 7
-                
-                # HIGH: Next buffer pieces
-                buffer_pieces = header_pieces * 2
-                for i in range(start_piece + header_pieces, min(start_piece + header_pieces + buffer_pieces, end_piece + 1)):
-                    priorities[i] = 6
-                
-                # CRITICAL: Last pieces - ExoPlayer reads the end for moov atom / mkv seekhead
-                last_piece_count = max(10, 2 * 1024 * 1024 // piece_length)  # ~2MB from end
-                for i in range(max(start_piece, end_piece - last_piece_count), end_piece + 1):
-                    priorities[i] = 7  # Same as header - MUST download these early
-                
-                # First set FILE priorities (which file to download)
-                # This must be called BEFORE prioritize_pieces() because it overrides piece priorities!
-                file_priorities = [0] * files.num_files()
-                file_priorities[largest_video['index']] = 4  # Download video file
-                handle.prioritize_files(file_priorities)
-                
-                # THEN set PIECE priorities (which parts of the file to download first)
-                # This MUST be called AFTER prioritize_files() to override its settings
-                handle.prioritize_pieces(priorities)
-                
-                logger.info(f"Found video: {largest_video['path']} ({largest_size / 1024 / 1024:.1f} MB)")
-                logger.info(f"Piece info: {video_pieces} pieces @ {piece_length // 1024}KB each, prioritizing first {header_pieces} + {buffer_pieces} buffer")
-        
-        # Calculate progress and readiness
-        video_file = data.get('video_file')
-        if video_file:
-            video_size = video_file['size']
-            downloaded_bytes = int(s.progress * video_size) if s.progress > 0 else 0
-            
-            # Check if file exists and has content
-            video_path = data.get('video_path')
-            file_exists = video_path and os.path.exists(video_path)
-            file_size_on_disk = os.path.getsize(video_path) if file_exists else 0
-            
-            # CRITICAL: Check if the video file has valid header data on disk
-            # libtorrent writes partial piece data to disk even before pieces are "complete"
-            # So we check the actual file content instead of piece status
-            first_pieces_ready = False
-            last_pieces_ready = False
-            try:
-                if file_exists and file_size_on_disk > 0:
-                    # Check for valid video header in first 32 bytes
-                    with open(video_path, 'rb') as f:
-                        header = f.read(32)
-                        has_ftyp = b'ftyp' in header  # MP4/M4V
-                        has_ebml = header[:4] == b'\x1a\x45\xdf\xa3'  # MKV/WebM
-                        has_avi = header[:4] == b'RIFF'  # AVI
-                        has_valid_header = has_ftyp or has_ebml or has_avi
-                    
-                    # Ready when: valid video header + at least 2MB on disk
-                    # 2MB is enough for ExoPlayer to start - it handles its own buffering
-                    min_buffer = 2 * 1024 * 1024  # 2MB minimum buffer - quick start
-                    first_pieces_ready = has_valid_header and file_size_on_disk >= min_buffer
-                    
-                    if first_pieces_ready:
-                        logger.info(f"Video file ready: {os.path.basename(video_path)}, "
-                                   f"header={'ftyp' if has_ftyp else 'ebml' if has_ebml else 'avi'}, "
-                                   f"size_on_disk={file_size_on_disk/1024/1024:.1f}MB, peers={s.num_peers}")
-                
-                # Last pieces: check if end of file has data (for moov atom)
-                last_pieces_ready = True  # Don't block on last pieces
-            except Exception as e:
-                logger.warning(f"File check error: {e}")
-                first_pieces_ready = file_size_on_disk >= 512 * 1024
-            
-            # Ready = first pieces of video are downloaded (header/moov atom at beginning)
-            # Last pieces are prioritized at 7 but we don't wait for them - ExoPlayer handles buffering
-            is_ready = first_pieces_ready
-            min_bytes_for_playback = 2 * 1024 * 1024  # 2MB for readiness - quick start
-            ready_threshold = min_bytes_for_playback
-            
-            return {
-                "status": "ready" if is_ready else "buffering",
-                "progress": s.progress * 100,
-                "ready_progress": min(100, (downloaded_bytes / ready_threshold) * 100) if ready_threshold > 0 else 0,
-                "peers": s.num_peers,
-                "download_rate": s.download_rate,
-                "upload_rate": s.upload_rate,
-                "video_file": video_file['path'],
-                "video_size": video_size,
-                "downloaded": downloaded_bytes,
-                "file_ready": file_exists,
-                "first_pieces_ready": first_pieces_ready,
-                "last_pieces_ready": last_pieces_ready,
-                "ready_threshold_mb": ready_threshold / (1024 * 1024),
-            }
-        
-        return {
-            "status": "buffering",
-            "progress": s.progress * 100,
-            "peers": s.num_peers,
-            "download_rate": s.download_rate,
-        }
-    
-    def get_video_path(self, info_hash: str) -> Optional[str]:
-        """Get the path to the video file"""
-        info_hash = info_hash.lower()
-        if info_hash in self.sessions:
-            return self.sessions[info_hash].get('video_path')
-        return None
-    
-    def cleanup_old_sessions(self, max_age_hours=1):
-        """Remove old torrent sessions and their downloaded files"""
-        current_time = time.time()
-        to_remove = []
-        
-        for info_hash, data in self.sessions.items():
-            if current_time - data['created'] > max_age_hours * 3600:
-                to_remove.append(info_hash)
-        
-        for info_hash in to_remove:
-            try:
-                data = self.sessions[info_hash]
-                data['session'].remove_torrent(data['handle'])
-                # Clean up downloaded files
-                video_path = data.get('video_path')
-                if video_path and os.path.exists(video_path):
-                    os.remove(video_path)
-                    logger.info(f"Removed file: {video_path}")
-                del self.sessions[info_hash]
-                logger.info(f"Cleaned up session for {info_hash}")
-            except Exception as e:
-                logger.error(f"Error cleaning up session {info_hash}: {e}")
-        
-        # Also clean up any orphaned files in the download directory
-        try:
-            if os.path.exists(self.download_dir):
-                total_size = sum(
-                    os.path.getsize(os.path.join(dp, f))
-                    for dp, dn, fns in os.walk(self.download_dir)
-                    for f in fns
-                )
-                if total_size > 5 * 1024 * 1024 * 1024:  # Over 5GB
-                    logger.warning(f"Download dir is {total_size / (1024**3):.1f}GB, cleaning up...")
-                    # Remove oldest session's files
-                    if self.sessions:
-                        oldest = min(self.sessions.keys(), key=lambda k: self.sessions[k]['created'])
-                        self.cleanup_session(oldest)
-        except Exception as e:
-            logger.error(f"Error checking disk usage: {e}")
-    
-    def cleanup_session(self, info_hash):
-        """Clean up a specific torrent session and its files"""
-        info_hash = info_hash.lower()
-        if info_hash in self.sessions:
-            try:
-                data = self.sessions[info_hash]
-                if LIBTORRENT_AVAILABLE and data.get('session') and data.get('handle'):
-                    try:
-                        data['session'].remove_torrent(data['handle'])
-                    except Exception:
-                        pass
-                # Clean up ALL files in the torrent's download subdirectory
-                save_path = data.get('save_path', '')
-                if save_path and os.path.exists(save_path):
-                    import shutil
-                    shutil.rmtree(save_path, ignore_errors=True)
-                    logger.info(f"Removed directory: {save_path}")
-                else:
-                    video_path = data.get('video_path')
-                    if video_path and os.path.exists(video_path):
-                        os.remove(video_path)
-                del self.sessions[info_hash]
-                logger.info(f"Cleaned up session for {info_hash}")
-            except Exception as e:
-                logger.error(f"Error cleaning up session {info_hash}: {e}")
-    
-    def _cleanup_disk(self):
-        """Emergency cleanup - remove ALL orphaned torrent files"""
-        try:
-            import shutil
-            for item in os.listdir('/tmp'):
-                if item.startswith('privastream_'):
-                    path = os.path.join('/tmp', item)
-                    # Don't remove the current download dir
-                    if path != self.download_dir:
-                        shutil.rmtree(path, ignore_errors=True)
-                        logger.info(f"Cleaned orphaned dir: {path}")
-        except Exception as e:
-            logger.error(f"Disk cleanup error: {e}")
-
-# Global torrent streamer instance
-torrent_streamer = TorrentStreamer()
+# This provides Stremio-like torrent streaming capabilities (the libtorrent
+# side lives in torrent_streaming.py)
 
-# Background cleanup task
-async def periodic_cleanup():
-    """Run cleanup every 10 minutes"""
-    while True:
-        await asyncio.sleep(600)
-        try:
-            torrent_streamer.cleanup_old_sessions(max_age_hours=1)
-        except Exception as e:
-            logger.error(f"Periodic cleanup error: {e}")
+# Global torrent streamer instance.  With libtorrent, one engine process per
+# host owns the session (torrent_engine.py, started by the V178A leader) and
+# workers get a proxy to it.  TORRENT_ENGINE_MODE=local keeps a session in
+# each process instead; the engine process itself runs with 'engine'.
+TORRENT_ENGINE_MODE = os.environ.get('TORRENT_ENGINE_MODE', 'host')
+if LIBTORRENT_AVAILABLE and TORRENT_ENGINE_MODE == 'host':
+    torrent_streamer = TorrentEngineProxy()
+else:
+    torrent_streamer = TorrentStreamer()
 
 
 # ==================== MODELS ====================
@@ -787,6 +299,23 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+_background_tasks: set = set()
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background task {task.get_name()} failed: {task.exception()!r}")
+
+
+def spawn_background(coro) -> asyncio.Task:
+    """create_task for fire-and-forget work: the task is referenced until it
+    finishes (the loop only keeps weak references) and failures are logged"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
 def get_base_url(manifest_url: str) -> str:
     """Extract base URL from manifest URL"""
     if manifest_url.endswith('/manifest.json'):
@@ -900,22 +429,120 @@ def stop_torrent_server():
             _torrent_server_process.kill()
         _torrent_server_process = None
 
+def start_torrent_engine():
+    """Start the host-wide torrent engine (a no-op if one is already running).
+    It is not stopped with this worker: it outlives leader recycles and exits
+    when the gunicorn master does."""
+    try:
+        env = os.environ.copy()
+        env['TORRENT_ENGINE_MASTER_PID'] = str(os.getppid())
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).parent / 'torrent_engine.py')],
+            cwd=str(Path(__file__).parent),
+            env=env,
+            start_new_session=True,
+        )
+        logger.info(f"Torrent engine launched (PID: {process.pid})")
+    except Exception as e:
+        logger.error(f"Failed to start torrent engine: {e}")
+
+ENGINE_WATCHDOG_INTERVAL = 5  # seconds between engine liveness checks
+ENGINE_START_GRACE = 30  # a launched engine gets this long to start publishing
+
+async def engine_watchdog():
+    """Relaunch the host engine when its socket disappears or its status
+    heartbeat goes stale (leader only).  A hung engine still holds the engine
+    lock, so it is killed first or the new copy would exit at once."""
+    launched = time.monotonic()
+    while True:
+        await asyncio.sleep(ENGINE_WATCHDOG_INTERVAL)
+        if time.monotonic() - launched < ENGINE_START_GRACE:
+            continue
+        if os.path.exists(ENGINE_SOCKET) and torrent_streamer.engine_alive():
+            continue
+        pid = engine_pid()
+        logger.warning(f"Torrent engine is down (PID: {pid}), relaunching")
+        if pid:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            await asyncio.sleep(1)
+        start_torrent_engine()
+        launched = time.monotonic()
+
 # Register cleanup on exit
 atexit.register(stop_torrent_server)
 
+async def ensure_indexes():
+    """Create the Mongo indexes the shared tables rely on (idempotent)"""
+    try:
+        await db.stream_health.create_index("url", unique=True)
+        await db.stream_health.create_index("seen_at", expireAfterSeconds=STREAM_HEALTH_RETENTION)
+        await db.cast_index.create_index("id", unique=True)
+        await db.stream_availability.create_index("id", unique=True)
+        await db.watch_progress.create_index([("user_id", 1), ("content_id", 1)])
+        await db.watch_progress.create_index([("user_id", 1), ("in_continue", 1), ("updated_at", -1)])
+        await db.watch_progress.create_index("deleted_at", expireAfterSeconds=PROGRESS_TOMBSTONE_TTL)
+    except Exception as e:
+        logger.warning(f"Index creation failed: {e}")
+    
+    # Nothing queries cast_index by name; an earlier version indexed it
+    try:
+        if "cast_1" in await db.cast_index.index_information():
+            await db.cast_index.drop_index("cast_1")
+    except Exception as e:
+        logger.warning(f"Dropping the cast name index failed: {e}")
+    
+    try:
+        await db.library.create_index([("user_id", 1), ("type", 1), ("_id", 1)])
+        await db.library.create_index([("user_id", 1), ("imdb_id", 1)])
+    except Exception as e:
+        logger.warning(f"Library index creation failed: {e}")
+    
+    # add_to_library relies on the unique (user_id, id) index for idempotency;
+    # rows duplicated before it existed are removed first (the oldest is kept)
+    try:
+        duplicates = await db.library.aggregate([
+            {"$group": {"_id": {"user_id": "$user_id", "id": "$id"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": 1}}},
+        ], allowDiskUse=True).to_list(None)
+        extra = [oid for group in duplicates for oid in sorted(group["ids"])[1:]]
+        if extra:
+            await db.library.delete_many({"_id": {"$in": extra}})
+            logger.info(f"Removed {len(extra)} duplicate library rows")
+        await db.library.create_index([("user_id", 1), ("id", 1)], unique=True)
+    except Exception as e:
+        logger.error(f"Unique library index missing - library adds are not idempotent: {e}")
+    
+    # Progress saved before the continue-watching view existed has no in_continue flag
+    try:
+        await db.watch_progress.update_many(
+            {"in_continue": {"$exists": False}},
+            [{"$set": {"in_continue": {"$and": [
+                {"$gt": ["$progress", 0]},
+                {"$lte": [{"$ifNull": ["$percent_watched", 0]}, CONTINUE_WATCHING_MAX_PERCENT]}
+            ]}}}]
+        )
+    except Exception as e:
+        logger.warning(f"Continue-watching backfill failed: {e}")
+
 @app.on_event("startup")
 async def create_default_admin():
     """Create default admin user if not exists and start torrent server.
 
-    V178A_LEADER_LOCK: torrent-server subprocess and periodic cleanup
-    task are gated to a single elected leader worker so multi-worker
+    V178A_LEADER_LOCK: torrent-server subprocess, periodic cleanup and
+    the live-channel health prober are gated to a single elected leader worker so multi-worker
     gunicorn deployments do not spawn N torrent-servers fighting over
     port 8002.  The admin upsert is idempotent and runs in every
-    worker so each has a primed cache."""
+    worker so each has a primed cache, as does the progress flusher
+    (every worker buffers its own heartbeats)."""
     _v178a_leader = _v178a_acquire_leader_lock()
     if _v178a_leader:
         logger.info(f"V178A: PID {os.getpid()} is the LEADER — managing torrent-server + periodic cleanup")
         start_torrent_server()
+        if isinstance(torrent_streamer, TorrentEngineProxy):
+            start_torrent_engine()
     else:
         logger.info(f"V178A: PID {os.getpid()} is a FOLLOWER — skipping torrent-server start")
 
@@ -937,9 +564,22 @@ async def create_default_admin():
             )
             logger.info("Updated choyt to admin status")
     
+    spawn_background(progress_flusher())
+    if LIBTORRENT_AVAILABLE and TORRENT_ENGINE_MODE == 'local':
+        spawn_background(alert_pump(torrent_streamer))
+        spawn_background(piece_scheduler(torrent_streamer))
+        spawn_background(admission_controller(torrent_streamer))
+        spawn_background(resume_saver(torrent_streamer))
+    
     # Start periodic cleanup for torrent downloads (LEADER ONLY — V178A)
+    # (the host engine runs its own)
     if _v178a_leader:
-        asyncio.create_task(periodic_cleanup())
+        await ensure_indexes()
+        if isinstance(torrent_streamer, TorrentStreamer):
+            spawn_background(periodic_cleanup(torrent_streamer))
+        else:
+            spawn_background(engine_watchdog())
+        spawn_background(stream_health_prober())
 
 
 
@@ -1536,10 +1176,485 @@ async def proxy_addon_streams(
     return {"streams": []}
 
 
+# ==================== EPISODE INDEX ====================
+# Torrent sources for series are scraped once per show (EZTV) or once per season
+# (ApiBay) and indexed by (season, episode).  Every episode request after the
+# first is a dict lookup instead of another round of scraping.
+
+_EP_RANGE_RE = re.compile(r'\bS(\d{1,2})[ ._-]?E(\d{1,3})(?:[ ._]*-?[ ._]*E(\d{1,3}))?', re.IGNORECASE)
+_EP_X_RE = re.compile(r'\b(\d{1,2})x(\d{2,3})\b', re.IGNORECASE)
+_SEASON_RANGE_RE = re.compile(r'\b(?:S|Seasons?[ ._-]?)(\d{1,2})[ ._]*-[ ._]*S?(\d{1,2})\b', re.IGNORECASE)
+_SEASON_RE = re.compile(r'\b(?:S|Season[ ._-]?)(\d{1,2})\b', re.IGNORECASE)
+_VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.webm', '.mov', '.m4v', '.ts')
+
+# info_hash -> {(season, episode): file index}, filled once a pack's metadata is known
+_pack_file_map: Dict[str, Dict[tuple, int]] = {}
+PACK_FILE_MAP_MAX_ENTRIES = 500
+
+
+def parse_episode_coverage(title: str) -> Dict[int, Optional[set]]:
+    """Return {season: set(episodes)} for a release name.
+    A value of None means the release is a whole-season pack."""
+    coverage: Dict[int, Optional[set]] = {}
+    for m in _EP_RANGE_RE.finditer(title):
+        season, start = int(m.group(1)), int(m.group(2))
+        end = int(m.group(3)) if m.group(3) else start
+        if end < start or end - start > 50:
+            end = start
+        coverage.setdefault(season, set()).update(range(start, end + 1))
+    if not coverage:
+        for m in _EP_X_RE.finditer(title):
+            coverage.setdefault(int(m.group(1)), set()).add(int(m.group(2)))
+    if coverage:
+        return coverage
+
+    # No episode tag - season pack ("S01", "Season 2", "S01-S03")
+    m = _SEASON_RANGE_RE.search(title)
+    if m:
+        first, last = int(m.group(1)), int(m.group(2))
+        if first <= last <= first + 30:
+            for season in range(first, last + 1):
+                coverage[season] = None
+            return coverage
+    for m in _SEASON_RE.finditer(title):
+        coverage[int(m.group(1))] = None
+    return coverage
+
+
+def build_episode_index(streams: list, title_of=lambda s: s.get('title', '')) -> dict:
+    """Index formatted streams by (season, episode); season packs go under packs[season]."""
+    index = {"streams": [], "by_episode": {}, "packs": {}, "hashes": set()}
+    merge_into_episode_index(index, streams, title_of)
+    return index
+
+
+def merge_into_episode_index(index: dict, streams: list, title_of=lambda s: s.get('title', '')):
+    """Add streams to an existing index, skipping info hashes it already holds"""
+    for stream in streams:
+        info_hash = stream.get('infoHash', '')
+        if info_hash and info_hash in index["hashes"]:
+            continue
+        if info_hash:
+            index["hashes"].add(info_hash)
+        index["streams"].append(stream)
+        coverage = stream.pop('_coverage', None) or parse_episode_coverage(title_of(stream))
+        for season, episodes in coverage.items():
+            if episodes is None:
+                index["packs"].setdefault(season, []).append(dict(stream, seasonPack=True, season=season))
+            else:
+                for episode in episodes:
+                    index["by_episode"].setdefault((season, episode), []).append(stream)
+
+
+def _resolve_pack_file_idx(info_hash: str, season: int, episode: int) -> Optional[int]:
+    """Find the file inside a season pack that holds the episode.
+    Only possible once libtorrent has the pack's metadata; the result is remembered."""
+    info_hash = info_hash.lower()
+    files_by_episode = _pack_file_map.get(info_hash)
+    if files_by_episode is None:
+        data = torrent_streamer.sessions.get(info_hash)
+        handle = data.get('handle') if data else None
+        try:
+            if handle is not None and data['state']['has_metadata'] and handle.is_valid():
+                ti = handle.get_torrent_info()
+            else:
+                # Host engine (or no session here): the engine stored the metadata
+                stored = load_torrent_metadata(info_hash) if LIBTORRENT_AVAILABLE else None
+                if not stored:
+                    return None
+                ti = lt.torrent_info(lt.bdecode(stored))
+            files = ti.files()
+            files_by_episode = {}
+            for i in range(files.num_files()):
+                path = files.file_path(i)
+                if not path.lower().endswith(_VIDEO_EXTENSIONS):
+                    continue
+                for s, episodes in parse_episode_coverage(os.path.basename(path)).items():
+                    for e in episodes or ():
+                        files_by_episode.setdefault((s, e), i)
+            _pack_file_map[info_hash] = files_by_episode
+            while len(_pack_file_map) > PACK_FILE_MAP_MAX_ENTRIES:
+                del _pack_file_map[next(iter(_pack_file_map))]
+        except Exception as e:
+            logger.debug(f"Pack file map failed for {info_hash}: {e}")
+            return None
+    return files_by_episode.get((season, episode))
+
+
+def episode_index_lookup(index: dict, season: int, episode: int) -> list:
+    """Streams for one episode: exact matches first, then packs covering its season.
+    A pack is only offered once the episode's file inside it is known - without
+    a fileIdx the player would open the pack's largest file.  Returns copies, so
+    callers can't alter the cached index."""
+    streams = [dict(stream) for stream in index["by_episode"].get((season, episode), [])]
+    for pack in index["packs"].get(season, []):
+        file_idx = _resolve_pack_file_idx(pack.get('infoHash', ''), season, episode)
+        if file_idx is not None:
+            streams.append(dict(pack, fileIdx=file_idx))
+    return streams
+
+
+def _prune_episode_index_cache():
+    """Drop expired indexes, then the soonest-to-expire ones if still over the cap"""
+    now = datetime.utcnow()
+    for key in [k for k, v in _episode_index_cache.items() if v["expires"] <= now]:
+        del _episode_index_cache[key]
+    overflow = len(_episode_index_cache) - EPISODE_INDEX_MAX_ENTRIES
+    if overflow > 0:
+        for key in sorted(_episode_index_cache, key=lambda k: _episode_index_cache[k]["expires"])[:overflow]:
+            del _episode_index_cache[key]
+
+
+async def get_episode_index(key: str, builder) -> Optional[dict]:
+    """Return the cached index for key, building it at most once at a time.
+    Concurrent episode requests for the same show share one in-flight build.
+    Builders return None on upstream failure, which is not cached."""
+    cached = _episode_index_cache.get(key)
+    if cached and cached["expires"] > datetime.utcnow():
+        return cached["data"]
+
+    task = _episode_index_inflight.get(key)
+    if task is None:
+        async def build_and_store():
+            index = await builder()
+            if index is not None:
+                _prune_episode_index_cache()
+                _episode_index_cache[key] = {
+                    "data": index,
+                    "expires": datetime.utcnow() + timedelta(seconds=EPISODE_INDEX_TTL)
+                }
+            return index
+
+        task = asyncio.create_task(build_and_store())
+        _episode_index_inflight[key] = task
+        task.add_done_callback(lambda _t: _episode_index_inflight.pop(key, None))
+
+    try:
+        # Shield so one cancelled request doesn't abort the build other requests are waiting on
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Episode index build failed for {key}: {e}")
+        return None
+
+
+EZTV_PAGE_SIZE = 100
+EZTV_MAX_PAGES = 5
+
+
+def _format_eztv_torrent(torrent: dict) -> Optional[dict]:
+    info_hash = torrent.get('hash', '').lower()
+    if not info_hash:
+        return None
+    title = torrent.get('title', '')
+    quality = '4K' if '2160p' in title or '4K' in title else ('HD' if '1080p' in title or '720p' in title else 'SD')
+    size_bytes = int(torrent.get('size_bytes', 0) or 0)
+    size_str = f"{size_bytes / (1024*1024*1024):.2f} GB" if size_bytes > 1024*1024*1024 else f"{size_bytes / (1024*1024):.0f} MB"
+    seeds = torrent.get('seeds', 0)
+    stream = {
+        "name": f"📺 EZTV {quality}",
+        "title": f"EZTV • {title}\n💾 {size_str} | 🌱 {seeds} | ⚡ {quality}",
+        "infoHash": info_hash,
+        "sources": ["tracker:http://tracker.opentrackr.org:1337/announce"],
+        "addon": "EZTV",
+        "seeders": seeds
+    }
+    # EZTV tags each torrent with season/episode; episode "0" marks a season pack
+    try:
+        season, episode = int(torrent.get('season') or 0), int(torrent.get('episode') or 0)
+    except (TypeError, ValueError):
+        season, episode = 0, 0
+    if season > 0:
+        stream['_coverage'] = {season: {episode} if episode > 0 else None}
+    return stream
+
+
+async def fetch_eztv_show_index(imdb_id: str) -> Optional[dict]:
+    """Fetch every EZTV torrent for a show (paged) and index it by episode"""
+    imdb_num = imdb_id.replace('tt', '') if imdb_id.startswith('tt') else imdb_id
+    url = "https://eztv.re/api/get-torrents"
+    client = await get_shared_http_client()
+
+    async def fetch_page(page: int) -> list:
+        response = await client.get(url, params={"imdb_id": imdb_num, "limit": EZTV_PAGE_SIZE, "page": page}, timeout=10.0)
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(f"EZTV status {response.status_code}", request=response.request, response=response)
+        return response.json()
+
+    try:
+        first = await fetch_page(1)
+    except Exception as e:
+        logger.warning(f"EZTV search error: {e}")
+        return None
+
+    torrents = list(first.get('torrents') or [])
+    total = int(first.get('torrents_count') or len(torrents))
+    pages = min(EZTV_MAX_PAGES, -(-total // EZTV_PAGE_SIZE))
+    if pages > 1:
+        more = await asyncio.gather(*[fetch_page(p) for p in range(2, pages + 1)], return_exceptions=True)
+        for page_data in more:
+            if isinstance(page_data, dict):
+                torrents.extend(page_data.get('torrents') or [])
+
+    streams = [s for s in (_format_eztv_torrent(t) for t in torrents) if s]
+    index = build_episode_index(streams)
+    logger.info(f"EZTV index for {imdb_id}: {len(streams)} torrents, {len(index['by_episode'])} episodes, {len(index['packs'])} season packs")
+    return index
+
+
+# ==================== QUERY VARIANT RACING ====================
+# Scrapers with fallback ladders (ApiBay query variants, Torrentio proxy vs
+# cloudscraper) launch their variants with staggered starts instead of one
+# after another.  The first non-empty result wins, the rest are cancelled,
+# and the winning variant is remembered per title so it launches first next time.
+
+_variant_winners: "OrderedDict[str, Any]" = OrderedDict()  # {key: {"variant": name, "expires": datetime}}, least recently used first
+VARIANT_STAGGER = 1.5  # seconds before the next variant is launched alongside
+VARIANT_WINNER_TTL = 6 * 3600
+VARIANT_WINNERS_MAX = 2000
+
+_CLOUDSCRAPER_BROWSER = {'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+APIBAY_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Referer": "https://thepiratebay.org/"
+}
+
+
+async def race_variants(key: str, variants: list, stagger: float = VARIANT_STAGGER) -> Optional[list]:
+    """Run (name, coroutine_factory) variants with staggered starts.
+    Returns the first non-empty result, [] when every variant comes back empty,
+    or None when none of them answered (each raised or returned None)."""
+    remembered = _variant_winners.get(key)
+    if remembered and remembered["expires"] > datetime.utcnow():
+        _variant_winners.move_to_end(key)
+        variants = sorted(variants, key=lambda v: v[0] != remembered["variant"])
+
+    loop = asyncio.get_running_loop()
+    queue = list(variants)
+    pending: Dict[asyncio.Task, str] = {}
+    answered = False
+    try:
+        while queue or pending:
+            if queue:
+                name, factory = queue.pop(0)
+                pending[asyncio.create_task(factory())] = name
+            next_launch = loop.time() + stagger if queue else None
+            while pending:
+                timeout = None if next_launch is None else max(0.0, next_launch - loop.time())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break  # stagger elapsed - launch the next variant alongside
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.debug(f"Variant {name} for {key} failed: {e}")
+                        continue
+                    answered = answered or result is not None
+                    if result:
+                        _variant_winners[key] = {
+                            "variant": name,
+                            "expires": datetime.utcnow() + timedelta(seconds=VARIANT_WINNER_TTL)
+                        }
+                        _variant_winners.move_to_end(key)
+                        while len(_variant_winners) > VARIANT_WINNERS_MAX:
+                            _variant_winners.popitem(last=False)
+                        return result
+                if not pending and queue:
+                    break  # everything so far came back empty - don't wait out the stagger
+        return [] if answered else None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def cloudscraper_get(url: str, timeout: float = 15):
+    """GET through cloudscraper in a worker thread (it is sync-only)"""
+    import cloudscraper
+    scraper = cloudscraper.create_scraper(browser=_CLOUDSCRAPER_BROWSER)
+    return await asyncio.to_thread(lambda: scraper.get(url, timeout=timeout))
+
+
+def parse_torrentio_streams(raw_streams: list) -> list:
+    """Normalize Torrentio streams: infoHash, seeders and quality"""
+    streams = []
+    for stream in raw_streams:
+        name = stream.get('name', '')
+        title = stream.get('title', '')
+        
+        # Extract infoHash from various formats
+        info_hash = None
+        behavior_hints = stream.get('behaviorHints', {})
+        if stream.get('infoHash'):
+            info_hash = stream['infoHash'].lower()
+        elif len(behavior_hints.get('bingeGroup', '')) == 40:
+            info_hash = behavior_hints['bingeGroup'].lower()
+        
+        # Also check URL for magnet
+        stream_url = stream.get('url', '')
+        if not info_hash and 'magnet:' in stream_url:
+            hash_match = re.search(r'btih:([a-fA-F0-9]{40})', stream_url)
+            if hash_match:
+                info_hash = hash_match.group(1).lower()
+        
+        # Parse seeders from title (Torrentio format: "👤 123")
+        seeders = 0
+        if '👤' in title:
+            seeder_match = re.search(r'👤\s*(\d+)', title)
+            if seeder_match:
+                seeders = int(seeder_match.group(1))
+        
+        if info_hash:
+            quality = '4K' if any(q in name.upper() for q in ['2160P', '4K', 'UHD']) else \
+                     '1080p' if '1080P' in name.upper() else \
+                     '720p' if '720P' in name.upper() else 'SD'
+            streams.append({
+                "name": f"⚡ {name}",
+                "title": title,
+                "infoHash": info_hash,
+                "sources": ["tracker:http://tracker.opentrackr.org:1337/announce"],
+                "addon": "Torrentio",
+                "seeders": seeders,
+                "quality": quality
+            })
+    return streams
+
+
+async def fetch_cf_protected_streams(target_url: str, key: str, label: str) -> Optional[list]:
+    """Fetch a Stremio stream JSON from a Cloudflare-protected host (None if it
+    could not be reached).  allorigins.win (server IP is blocked) and
+    cloudscraper race as variants."""
+    import urllib.parse
+    proxy_url = f"https://api.allorigins.win/raw?url={urllib.parse.quote(target_url, safe='')}"
+    
+    async def via_allorigins():
+        client = await get_shared_http_client()
+        response = await client.get(proxy_url, timeout=20)
+        if response.status_code != 200:
+            logger.warning(f"{label} allorigins proxy returned status {response.status_code}")
+            return None
+        streams = response.json().get('streams', [])
+        logger.info(f"{label}: {len(streams)} streams via allorigins proxy")
+        return streams
+    
+    async def via_cloudscraper():
+        response = await cloudscraper_get(target_url, timeout=15)
+        if response.status_code != 200:
+            logger.warning(f"{label} cloudscraper returned status {response.status_code}")
+            return None
+        streams = response.json().get('streams', [])
+        logger.info(f"{label}: {len(streams)} streams via cloudscraper")
+        return streams
+    
+    return await race_variants(key, [("allorigins", via_allorigins), ("cloudscraper", via_cloudscraper)])
+
+
+# ==================== LIVE CHANNEL HEALTH ====================
+# USA TV stream URLs are HEAD-checked by the leader worker on a schedule
+# through one pooled client.  Results live in the shared stream_health
+# collection (TTL-bounded on last sighting), and request handlers only read
+# them - listing channels never makes a probe request of its own.
+
+STREAM_HEALTH_INTERVAL = 180  # seconds between probe rounds
+STREAM_HEALTH_CONCURRENCY = 16
+STREAM_HEALTH_TIMEOUT = 3.0
+STREAM_HEALTH_RETENTION = 24 * 3600  # forget URLs no request has listed for a day
+STREAM_HEALTH_SNAPSHOT_TTL = 30  # seconds a worker reuses its copy of the table
+STREAM_HEALTH_REGISTER_TTL = 3600  # seconds before a worker refreshes a URL's seen_at again
+
+_stream_health_snapshot: Dict[str, Any] = {"data": {}, "expires": 0.0}
+_stream_health_registered: Dict[str, float] = {}  # url -> when this worker last recorded it
+
+
+async def get_stream_health() -> Dict[str, Optional[bool]]:
+    """url -> ok (None = not probed yet), refreshed from Mongo at most every 30s"""
+    if _stream_health_snapshot["expires"] > time.time():
+        return _stream_health_snapshot["data"]
+    try:
+        docs = await db.stream_health.find({}, {"_id": 0, "url": 1, "ok": 1}).to_list(10000)
+        _stream_health_snapshot["data"] = {d["url"]: d.get("ok") for d in docs}
+    except Exception as e:
+        logger.warning(f"Stream health read failed: {e}")
+    _stream_health_snapshot["expires"] = time.time() + STREAM_HEALTH_SNAPSHOT_TTL
+    return _stream_health_snapshot["data"]
+
+
+async def register_live_streams(streams: list):
+    """Record channel URLs so the prober picks them up; refreshes seen_at.
+    Each worker writes a URL at most once per STREAM_HEALTH_REGISTER_TTL."""
+    now_ts = time.time()
+    for url in [u for u, at in _stream_health_registered.items() if now_ts - at >= STREAM_HEALTH_REGISTER_TTL]:
+        del _stream_health_registered[url]
+    streams = [s for s in streams if s["url"] not in _stream_health_registered]
+    if not streams:
+        return
+    for s in streams:
+        _stream_health_registered[s["url"]] = now_ts
+    now = datetime.utcnow()
+    try:
+        await db.stream_health.bulk_write([
+            UpdateOne(
+                {"url": s["url"]},
+                {"$set": {"seen_at": now, "provider": s.get("provider", "")}, "$setOnInsert": {"ok": None}},
+                upsert=True
+            )
+            for s in streams
+        ], ordered=False)
+    except Exception as e:
+        for s in streams:
+            _stream_health_registered.pop(s["url"], None)
+        logger.warning(f"Stream health register failed: {e}")
+
+
+async def probe_live_streams():
+    """One probe round over every known channel URL"""
+    docs = await db.stream_health.find({}, {"_id": 0, "url": 1, "provider": 1}).to_list(10000)
+    if not docs:
+        return
+    semaphore = asyncio.Semaphore(STREAM_HEALTH_CONCURRENCY)
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+    limits = httpx.Limits(max_connections=STREAM_HEALTH_CONCURRENCY, max_keepalive_connections=STREAM_HEALTH_CONCURRENCY)
+    
+    async with httpx.AsyncClient(follow_redirects=True, timeout=STREAM_HEALTH_TIMEOUT, limits=limits, headers=headers) as probe_client:
+        async def probe(doc) -> tuple:
+            async with semaphore:
+                try:
+                    resp = await probe_client.head(doc["url"])
+                    ok, status = resp.status_code < 400, resp.status_code
+                except Exception:
+                    ok, status = False, 0
+            if not ok:
+                logger.info(f"Stream health FAIL ({status or 'timeout'}): {doc.get('provider', '')} {doc['url'][:50]}")
+            return doc["url"], ok, status
+        
+        results = await asyncio.gather(*[probe(d) for d in docs])
+    now = datetime.utcnow()
+    await db.stream_health.bulk_write([
+        UpdateOne({"url": url}, {"$set": {"ok": ok, "status": status, "checked_at": now}})
+        for url, ok, status in results
+    ], ordered=False)
+    healthy = sum(1 for _, ok, _ in results if ok)
+    logger.info(f"Stream health: {healthy}/{len(results)} channel URLs healthy")
+
+
+async def stream_health_prober():
+    """Leader-only loop probing live channel URLs every STREAM_HEALTH_INTERVAL"""
+    while True:
+        try:
+            await probe_live_streams()
+        except Exception as e:
+            logger.error(f"Stream health prober error: {e}")
+        await asyncio.sleep(STREAM_HEALTH_INTERVAL)
+
+
 @api_router.get("/streams/{content_type}/{content_id:path}")
 async def get_all_streams(
     content_type: str,
     content_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Fetch streams from ALL installed addons + built-in Torrentio-style aggregation"""
@@ -1549,7 +1664,7 @@ async def get_all_streams(
     cached_streams = _discover_cache.get(stream_cache_key)
     if cached_streams and cached_streams["expires"] > datetime.utcnow():
         logger.info(f"Stream cache HIT for {content_type}/{content_id}")
-        return cached_streams["data"]
+        return payload_response(request, cached_streams["payload"])
     
     # Handle Porn+ / RedTube content IDs - extract video directly
     if 'RedTube-movie-' in content_id or 'porn_id:RedTube' in content_id:
@@ -1738,53 +1853,16 @@ async def get_all_streams(
                             "isLive": True,
                         })
                     
-                    # Health check: Test each stream URL in parallel
-                    # Only return streams that respond (filters out dead/broken providers)
-                    # Uses module-level cache to speed up repeated loads
-                    import asyncio as _asyncio
-                    import time as _time
-                    
-                    # Module-level cache (survives across requests)
-                    global _stream_health_cache
-                    if '_stream_health_cache' not in globals():
-                        _stream_health_cache = {}
-                    
-                    async def check_stream_health(stream_data: dict) -> bool:
-                        """Quick HEAD request to verify stream is accessible"""
-                        url = stream_data.get('url', '')
-                        provider = stream_data.get('provider', '')
-                        cache_key = f"{provider}:{url[:50]}"
-                        
-                        # Check cache (5 minute TTL)
-                        if cache_key in _stream_health_cache:
-                            cached_ok, cached_time = _stream_health_cache[cache_key]
-                            if _time.time() - cached_time < 300:  # 5 min cache
-                                return cached_ok
-                        
-                        try:
-                            async with httpx.AsyncClient(follow_redirects=True, timeout=3.0) as check_client:
-                                resp = await check_client.head(url, headers={
-                                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                                })
-                                is_ok = resp.status_code < 400
-                                _stream_health_cache[cache_key] = (is_ok, _time.time())
-                                if not is_ok:
-                                    logger.info(f"Stream health FAIL ({resp.status_code}): {provider} {url[:50]}")
-                                return is_ok
-                        except Exception:
-                            _stream_health_cache[cache_key] = (False, _time.time())
-                            logger.info(f"Stream health FAIL (timeout): {provider} {url[:50]}")
-                            return False
-                    
-                    # Check all streams in parallel (fast - all at once)
-                    health_results = await _asyncio.gather(
-                        *[check_stream_health(s) for s in formatted_streams]
-                    )
+                    # Health check: read the prober's results (no outbound calls here).
+                    # URLs the prober hasn't reached yet count as healthy.
+                    health = await get_stream_health()
+                    spawn_background(register_live_streams(formatted_streams))
+                    health_results = [health.get(s['url']) is not False for s in formatted_streams]
                     
                     # Filter to only working streams
                     working_streams = [s for s, ok in zip(formatted_streams, health_results) if ok]
                     
-                    logger.info(f"USA TV streams for {content_id}: {len(working_streams)}/{len(formatted_streams)} passed health check")
+                    logger.info(f"USA TV streams for {content_id}: {len(working_streams)}/{len(formatted_streams)} healthy")
                     
                     # If no streams passed health check, return all (let client try)
                     if not working_streams:
@@ -1812,6 +1890,7 @@ async def get_all_streams(
         meta_resp = await client.get(meta_url, follow_redirects=True)
         if meta_resp.status_code == 200:
             meta = meta_resp.json().get('meta', {})
+            record_cast(content_type, meta, base_id)
             content_title = meta.get('name', '')
             content_year = str(meta.get('year', ''))
             if '–' in content_year:
@@ -1849,7 +1928,8 @@ async def get_all_streams(
         logger.warning(f"Failed to fetch meta for streams: {e}")
     
     async def fetch_addon_streams(addon):
-        """Fetch streams from a single addon - with Cloudflare bypass for protected addons"""
+        """Fetch streams from a single addon - with Cloudflare bypass for protected addons
+        (None when the addon has no streams or could not be reached)"""
         try:
             manifest = addon.get('manifest', {})
             resources = manifest.get('resources', [])
@@ -1861,7 +1941,7 @@ async def get_all_streams(
             )
             
             if not has_stream:
-                return []
+                return None
             
             base_url = get_base_url(addon['manifestUrl'])
             stream_url = f"{base_url}/stream/{content_type}/{content_id}.json"
@@ -1871,54 +1951,19 @@ async def get_all_streams(
             needs_bypass = any(domain in base_url for domain in cf_protected_domains)
             
             if needs_bypass:
-                # Use allorigins.win proxy for Cloudflare bypass (server IP is blocked)
-                try:
-                    import urllib.parse
-                    encoded_url = urllib.parse.quote(stream_url, safe='')
-                    proxy_url = f"https://api.allorigins.win/raw?url={encoded_url}"
-                    
-                    client = await get_shared_http_client()
-                    response = await client.get(proxy_url, timeout=20)
-                    if response.status_code == 200:
-                        data = response.json()
-                        streams = data.get('streams', [])
-                        for stream in streams:
-                            stream['addon'] = manifest.get('name', 'Torrentio')
-                            # Parse seeders from Torrentio title format (👤 123)
-                            title = stream.get('title', '')
-                            if '👤' in title and not stream.get('seeders'):
-                                import re
-                                m = re.search(r'👤\s*(\d+)', title)
-                                if m:
-                                    stream['seeders'] = int(m.group(1))
-                        logger.info(f"Got {len(streams)} streams from {manifest.get('name')} via allorigins proxy")
-                        return streams
-                    else:
-                        logger.warning(f"Allorigins proxy got status {response.status_code} for {stream_url}")
-                except Exception as e:
-                    logger.warning(f"Allorigins proxy failed for {manifest.get('name')}: {e}")
-                
-                # Fallback to cloudscraper
-                try:
-                    import cloudscraper
-                    scraper = cloudscraper.create_scraper(
-                        browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
-                    )
-                    response = await asyncio.to_thread(
-                        lambda: scraper.get(stream_url, timeout=15)
-                    )
-                    if response.status_code == 200:
-                        data = response.json()
-                        streams = data.get('streams', [])
-                        for stream in streams:
-                            stream['addon'] = manifest.get('name', 'Torrentio')
-                        logger.info(f"Got {len(streams)} streams from {manifest.get('name')} via cloudscraper fallback")
-                        return streams
-                    else:
-                        logger.warning(f"Cloudscraper got status {response.status_code} for {stream_url}")
-                except Exception as e:
-                    logger.warning(f"Cloudscraper failed for {manifest.get('name')}: {e}")
-                return []
+                addon_name = manifest.get('name', 'Torrentio')
+                streams = await fetch_cf_protected_streams(stream_url, f"addon:{addon_name}:{content_id}", addon_name)
+                if streams is None:
+                    return None
+                for stream in streams:
+                    stream['addon'] = addon_name
+                    # Parse seeders from Torrentio title format (👤 123)
+                    title = stream.get('title', '')
+                    if '👤' in title and not stream.get('seeders'):
+                        m = re.search(r'👤\s*(\d+)', title)
+                        if m:
+                            stream['seeders'] = int(m.group(1))
+                return streams
             else:
                 # Standard fetch for non-protected addons
                 async with httpx.AsyncClient(follow_redirects=True, timeout=20.0) as client:
@@ -1931,7 +1976,7 @@ async def get_all_streams(
                         return streams
         except Exception as e:
             logger.warning(f"Error fetching streams from {addon.get('manifest', {}).get('name')}: {str(e)}")
-        return []
+        return None
     
     async def search_yts(query: str):
         """Search YTS/YIFY for movies"""
@@ -1962,94 +2007,36 @@ async def get_all_streams(
                                     })
                             logger.info(f"YTS found {len(streams)} streams for '{simple_query}'")
                             return streams
+                        return []
             except Exception as e:
                 logger.warning(f"YTS search error for {url}: {e}")
                 continue
-        return []
+        return None
     
     async def search_eztv(imdb_id: str, season: str = None, episode: str = None):
-        """Search EZTV for TV series - optionally filter by season/episode"""
-        try:
-            imdb_num = imdb_id.replace('tt', '') if imdb_id.startswith('tt') else imdb_id
-            url = "https://eztv.re/api/get-torrents"
-            params = {"imdb_id": imdb_num, "limit": 100}
-            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-                response = await client.get(url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    torrents = data.get('torrents', [])
-                    streams = []
-                    
-                    # Build episode pattern to filter (e.g., S01E05, S1E5, 1x05)
-                    episode_patterns = []
-                    if season and episode:
-                        s_padded = season.zfill(2)
-                        e_padded = episode.zfill(2)
-                        s_int = str(int(season))
-                        e_int = str(int(episode))
-                        episode_patterns = [
-                            f"S{s_padded}E{e_padded}",  # S01E05
-                            f"S{s_int}E{e_int}",        # S1E5
-                            f"S{s_int}E{e_padded}",     # S1E05
-                            f"S{s_padded}E{e_int}",     # S01E5
-                            f"{s_int}x{e_padded}",       # 1x05
-                        ]
-                    
-                    for torrent in torrents:
-                        title = torrent.get('title', '')
-                        
-                        # If we have episode patterns, filter to only matching episodes
-                        if episode_patterns:
-                            title_upper = title.upper()
-                            if not any(pat.upper() in title_upper for pat in episode_patterns):
-                                continue
-                        
-                        quality = '4K' if '2160p' in title or '4K' in title else ('HD' if '1080p' in title or '720p' in title else 'SD')
-                        size_bytes = int(torrent.get('size_bytes', 0))
-                        size_str = f"{size_bytes / (1024*1024*1024):.2f} GB" if size_bytes > 1024*1024*1024 else f"{size_bytes / (1024*1024):.0f} MB"
-                        seeds = torrent.get('seeds', 0)
-                        info_hash = torrent.get('hash', '').lower()
-                        if info_hash:
-                            streams.append({
-                                "name": f"📺 EZTV {quality}",
-                                "title": f"EZTV • {title}\n💾 {size_str} | 🌱 {seeds} | ⚡ {quality}",
-                                "infoHash": info_hash,
-                                "sources": ["tracker:http://tracker.opentrackr.org:1337/announce"],
-                                "addon": "EZTV",
-                                "seeders": seeds
-                            })
-                    return streams
-        except Exception as e:
-            logger.warning(f"EZTV search error: {e}")
-        return []
-    
-    async def search_apibay(query: str, content_type: str):
+        """Search EZTV for TV series - optionally filter by season/episode.
+        The whole show is fetched once and indexed; episodes are lookups."""
+        index = await get_episode_index(f"eztv:{imdb_id}", lambda: fetch_eztv_show_index(imdb_id))
+        if not index:
+            return None
+        if season and episode:
+            return episode_index_lookup(index, int(season), int(episode))
+        return list(index["streams"])
+    
+    async def search_apibay(query: str, content_type: str, max_results: int = 20):
         """Search PirateBay via apibay.org"""
-        import re
         
         async def do_search(search_query: str) -> list:
             try:
-                url = f"https://apibay.org/q.php?q={search_query}"
-                # Use cloudscraper to bypass ApiBay's bot detection
-                response = None
-                try:
-                    import cloudscraper
-                    scraper = cloudscraper.create_scraper(
-                        browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
-                    )
-                    response = await asyncio.to_thread(
-                        lambda: scraper.get(url, timeout=15)
-                    )
-                except Exception as cs_err:
-                    logger.warning(f"ApiBay cloudscraper failed: {cs_err}, trying httpx")
-                    # Fallback to httpx with browser UA
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                        "Accept": "application/json, text/javascript, */*; q=0.01",
-                        "Referer": "https://thepiratebay.org/"
-                    }
-                    async with httpx.AsyncClient(timeout=15.0, follow_redirects=True, headers=headers) as hclient:
-                        response = await hclient.get(url)
+                url = "https://apibay.org/q.php"
+                # Async request on the shared pool first; cloudscraper (in a thread)
+                # only when ApiBay's bot detection turns the plain request away
+                client = await get_shared_http_client()
+                response = await client.get(url, params={"q": search_query}, headers=APIBAY_HEADERS, timeout=10.0)
+                if response.status_code in (403, 429, 503) or not response.text.lstrip().startswith('['):
+                    logger.info(f"ApiBay blocked plain request ({response.status_code}), trying cloudscraper")
+                    import urllib.parse
+                    response = await cloudscraper_get(f"{url}?q={urllib.parse.quote(search_query)}", timeout=15)
                 
                 if response and response.status_code == 200:
                     torrents = response.json()
@@ -2068,7 +2055,7 @@ async def get_all_streams(
                                 'wwe', 'wrestling', 'aew', 'raw', 'smackdown'
                             ]
                             
-                            for torrent in torrents[:20]:
+                            for torrent in torrents[:max_results]:
                                 name = torrent.get('name', '')
                                 name_lower = name.lower()
                                 
@@ -2103,37 +2090,59 @@ async def get_all_streams(
                                         "seeders": seeds
                                     })
                             return streams
+                    return []
             except Exception as e:
                 logger.warning(f"ApiBay search error for '{search_query}': {e}")
-            return []
+            return None
         
         # Clean up query - remove special characters
         clean_query = re.sub(r'[^\w\s]', '', query)
         words = clean_query.split()
         
-        # Try with full query first (up to 5 words)
-        full_query = ' '.join(words[:5])
-        logger.info(f"ApiBay searching: '{full_query}'")
-        streams = await do_search(full_query)
+        # Query ladder: full query (up to 5 words), without a trailing year,
+        # then just the first 3 words.  Raced with staggered starts.
+        queries = [' '.join(words[:5])]
+        if len(words) > 2 and words[-1].isdigit() and len(words[-1]) == 4:
+            queries.append(' '.join(words[:-1][:4]))
+        if len(words) > 3:
+            queries.append(' '.join(words[:3]))
+        queries = list(dict.fromkeys(q for q in queries if q))
         
-        # If no results and query has year, try without year
-        if not streams and len(words) > 2:
-            # Check if last word is a year
-            if words[-1].isdigit() and len(words[-1]) == 4:
-                short_query = ' '.join(words[:-1][:4])
-                logger.info(f"ApiBay retry without year: '{short_query}'")
-                streams = await do_search(short_query)
-        
-        # If still no results, try with just first 3 words
-        if not streams and len(words) > 3:
-            shorter_query = ' '.join(words[:3])
-            logger.info(f"ApiBay retry shorter: '{shorter_query}'")
-            streams = await do_search(shorter_query)
+        logger.info(f"ApiBay searching: {queries}")
+        streams = await race_variants(
+            f"apibay:{queries[0].lower()}" if queries else "apibay:",
+            [(f"q{i}", lambda q=q: do_search(q)) for i, q in enumerate(queries)]
+        )
         
         if streams:
             logger.info(f"ApiBay found {len(streams)} streams")
         return streams
     
+    async def search_apibay_season(show_id: str, title: str, season: str, episode: str):
+        """ApiBay for one episode, served from a per-season index.
+        The season is searched once ("Show S01") and every episode of it is
+        indexed, including season packs.  If the season search didn't surface
+        this episode, fall back to the per-episode query and fold its results
+        into the cached index so the next request doesn't repeat it."""
+        s_int, e_int = int(season), int(episode)
+        
+        async def build():
+            season_streams = await search_apibay(f"{title} S{s_int:02d}", content_type, max_results=100)
+            return build_episode_index(season_streams or [])
+        
+        index = await get_episode_index(f"apibay:{show_id}:{s_int}", build)
+        if index and index["by_episode"].get((s_int, e_int)):
+            return episode_index_lookup(index, s_int, e_int)
+        
+        episode_streams = await search_apibay(f"{title} S{s_int:02d}E{e_int:02d}", content_type)
+        if index is not None:
+            merge_into_episode_index(index, episode_streams or [])
+            packs = [p for p in episode_index_lookup(index, s_int, e_int) if p.get('seasonPack')]
+            if episode_streams is None and not packs:
+                return None
+            return (episode_streams or []) + packs
+        return episode_streams
+    
     async def search_torrentio(content_type: str, content_id: str):
         """Search Torrentio addon for streams - aggregates YTS, RARBG, 1337x, etc."""
         try:
@@ -2144,119 +2153,15 @@ async def get_all_streams(
             base_url = f"https://torrentio.strem.fun/{torrentio_config}"
             target_url = f"{base_url}/stream/{content_type}/{content_id}.json"
             
-            # Use allorigins.win proxy to bypass Cloudflare (server IP is blocked)
-            import urllib.parse
-            encoded_url = urllib.parse.quote(target_url, safe='')
-            proxy_url = f"https://api.allorigins.win/raw?url={encoded_url}"
-            
-            try:
-                client = await get_shared_http_client()
-                response = await client.get(proxy_url, timeout=20)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    raw_streams = data.get('streams', [])
-                    streams = []
-                    
-                    for stream in raw_streams:
-                        # Parse Torrentio stream format
-                        name = stream.get('name', '')
-                        title = stream.get('title', '')
-                        
-                        # Extract infoHash from various formats
-                        info_hash = None
-                        behavior_hints = stream.get('behaviorHints', {})
-                        
-                        if 'infoHash' in stream:
-                            info_hash = stream['infoHash'].lower()
-                        elif behavior_hints.get('bingeGroup'):
-                            binge = behavior_hints.get('bingeGroup', '')
-                            if len(binge) == 40:
-                                info_hash = binge.lower()
-                        
-                        # Also check URL for magnet
-                        stream_url = stream.get('url', '')
-                        if not info_hash and 'magnet:' in stream_url:
-                            import re
-                            hash_match = re.search(r'btih:([a-fA-F0-9]{40})', stream_url)
-                            if hash_match:
-                                info_hash = hash_match.group(1).lower()
-                        
-                        # Parse seeders from title (Torrentio format: "👤 123")
-                        seeders = 0
-                        if '👤' in title:
-                            import re
-                            seeder_match = re.search(r'👤\s*(\d+)', title)
-                            if seeder_match:
-                                seeders = int(seeder_match.group(1))
-                        
-                        if info_hash:
-                            # Determine quality from name
-                            quality = '4K' if any(q in name.upper() for q in ['2160P', '4K', 'UHD']) else \
-                                     '1080p' if '1080P' in name.upper() else \
-                                     '720p' if '720P' in name.upper() else 'SD'
-                            
-                            streams.append({
-                                "name": f"⚡ {name}",
-                                "title": title,
-                                "infoHash": info_hash,
-                                "sources": ["tracker:http://tracker.opentrackr.org:1337/announce"],
-                                "addon": "Torrentio",
-                                "seeders": seeders,
-                                "quality": quality
-                            })
-                    
-                    logger.info(f"Torrentio found {len(streams)} streams for {content_type}/{content_id}")
-                    return streams
-                else:
-                    logger.warning(f"Torrentio proxy returned status {response.status_code}")
-            except Exception as e:
-                logger.warning(f"Torrentio proxy error: {e}")
-            
-            # Fallback: try cloudscraper directly (in case proxy is down)
-            try:
-                import cloudscraper
-                scraper = cloudscraper.create_scraper(
-                    browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
-                )
-                response = await asyncio.to_thread(
-                    lambda: scraper.get(target_url, timeout=15)
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    raw_streams = data.get('streams', [])
-                    streams = []
-                    for stream in raw_streams:
-                        name = stream.get('name', '')
-                        title = stream.get('title', '')
-                        info_hash = stream.get('infoHash', '').lower() if stream.get('infoHash') else None
-                        if not info_hash:
-                            behavior_hints = stream.get('behaviorHints', {})
-                            if behavior_hints.get('bingeGroup') and len(behavior_hints['bingeGroup']) == 40:
-                                info_hash = behavior_hints['bingeGroup'].lower()
-                        seeders = 0
-                        if '👤' in title:
-                            import re
-                            m = re.search(r'👤\s*(\d+)', title)
-                            if m: seeders = int(m.group(1))
-                        if info_hash:
-                            quality = '4K' if any(q in name.upper() for q in ['2160P', '4K', 'UHD']) else \
-                                     '1080p' if '1080P' in name.upper() else \
-                                     '720p' if '720P' in name.upper() else 'SD'
-                            streams.append({
-                                "name": f"⚡ {name}", "title": title, "infoHash": info_hash,
-                                "sources": ["tracker:http://tracker.opentrackr.org:1337/announce"],
-                                "addon": "Torrentio", "seeders": seeders, "quality": quality
-                            })
-                    logger.info(f"Torrentio (cloudscraper fallback) found {len(streams)} streams")
-                    return streams
-                else:
-                    logger.warning(f"Torrentio cloudscraper returned status {response.status_code}")
-            except Exception as e:
-                logger.warning(f"Torrentio cloudscraper fallback error: {e}")
+            raw_streams = await fetch_cf_protected_streams(target_url, f"torrentio:{content_id}", "Torrentio")
+            if raw_streams is None:
+                return None
+            streams = parse_torrentio_streams(raw_streams)
+            logger.info(f"Torrentio found {len(streams)} streams for {content_type}/{content_id}")
+            return streams
         except Exception as e:
             logger.warning(f"Torrentio search error: {e}")
-        return []
+        return None
     
     async def search_mediafusion(content_type: str, content_id: str):
         """Search MediaFusion for streams - works when Torrentio is blocked"""
@@ -2276,7 +2181,7 @@ async def get_all_streams(
                     return streams
         except Exception as e:
             logger.warning(f"MediaFusion error: {e}")
-        return []
+        return None
     
     async def search_comet(content_type: str, content_id: str):
         """Search Comet for streams - excellent Torrentio alternative"""
@@ -2296,7 +2201,7 @@ async def get_all_streams(
                     return streams
         except Exception as e:
             logger.warning(f"Comet error: {e}")
-        return []
+        return None
     
     # Build tasks
     tasks = []
@@ -2328,22 +2233,19 @@ async def get_all_streams(
             ep_episode = None
             if ':' in content_id:
                 parts = content_id.split(':')
-                if len(parts) >= 3:
+                if len(parts) >= 3 and parts[1].isdigit() and parts[2].isdigit():
                     ep_season = parts[1]
                     ep_episode = parts[2]
-                    season = parts[1].zfill(2)
-                    episode = parts[2].zfill(2)
-                    search_query = f"{content_title} S{season}E{episode}"
-                else:
-                    search_query = content_title
-            else:
-                search_query = content_title
             
             tasks.append(search_eztv(base_id, ep_season, ep_episode))
-            tasks.append(search_apibay(search_query, content_type))
+            if ep_season and ep_episode:
+                tasks.append(search_apibay_season(base_id, content_title, ep_season, ep_episode))
+            else:
+                tasks.append(search_apibay(content_title, content_type))
     
-    # Execute all tasks concurrently
+    # Execute all tasks concurrently; a source that could not be reached returns None
     results = await asyncio.gather(*tasks, return_exceptions=True)
+    sources_answered = sum(1 for result in results if isinstance(result, list))
     
     for result in results:
         if isinstance(result, list):
@@ -2392,6 +2294,12 @@ async def get_all_streams(
                 name = stream.get('name', '').upper()
                 combined = title + ' ' + name
                 
+                # Season packs from the episode index cover this episode by construction
+                # (they only carry a fileIdx once the episode's file was found)
+                if stream.get('seasonPack') and stream.get('fileIdx') is not None:
+                    filtered_streams.append(stream)
+                    continue
+                
                 # First check if it's explicitly wrong episode
                 if is_wrong_episode(combined):
                     continue
@@ -2523,14 +2431,20 @@ async def get_all_streams(
     
     logger.info(f"Found {len(unique_streams)} total streams for {content_type}/{content_id}")
     
+    # Nothing found only means "no streams" if some source actually answered
+    if unique_streams or sources_answered:
+        record_stream_availability(content_type, content_id, len(unique_streams))
+    
     # Cache the result (30 second TTL for streams - short to reflect sorting changes)
     result_data = {"streams": unique_streams}
+    payload = CachedPayload(result_data)
     _discover_cache[stream_cache_key] = {
         "data": result_data,
+        "payload": payload,
         "expires": datetime.utcnow() + timedelta(seconds=30)
     }
     
-    return result_data
+    return payload_response(request, payload)
 
 
 # ==================== SUBTITLES ====================
@@ -2590,63 +2504,785 @@ async def get_subtitles(content_type: str, content_id: str, current_user: User =
         return {"subtitles": []}
 
 
-# ==================== CONTENT ROUTES ====================
+# ==================== CAST INDEX ====================
+# Every Cinemeta meta the server fetches (get_meta, stream title resolution,
+# actor verification) has its cast recorded here and persisted to the
+# cast_index collection, keyed by content ID.  Actor-search verification
+# reads the cast from here and only fetches metas it has never seen (or whose
+# cast was empty more than CAST_EMPTY_TTL ago), under a concurrency cap.
 
-@api_router.get("/content/discover-organized")
-async def get_discover(current_user: User = Depends(get_current_user)):
-    """Get discover page content from installed addons - organized by service.
-    Uses parallel fetching and in-memory caching for speed."""
+CAST_FETCH_CONCURRENCY = 6
+CAST_CACHE_MAX_ENTRIES = 20000
+CAST_EMPTY_TTL = 24 * 3600  # Cinemeta often fills in the cast of new titles later
+
+_cast_cache: Dict[str, tuple] = {}  # {content_id: ([normalized cast names], recorded_at)}
+_cast_fetch_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _remember_cast(content_id: str, cast: list, recorded_at: float):
+    if content_id not in _cast_cache and len(_cast_cache) >= CAST_CACHE_MAX_ENTRIES:
+        _cast_cache.pop(next(iter(_cast_cache)))
+    _cast_cache[content_id] = (cast, recorded_at)
+
+
+def _cached_cast(content_id: str) -> Optional[list]:
+    """Known cast of a title; None if unknown or an empty cast has expired"""
+    entry = _cast_cache.get(content_id)
+    if entry is None or (not entry[0] and time.time() - entry[1] > CAST_EMPTY_TTL):
+        return None
+    return entry[0]
+
+
+def normalize_person_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    import unicodedata
+    decomposed = unicodedata.normalize('NFKD', name)
+    ascii_name = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.sub(r"[^\w\s]", ' ', ascii_name.lower()).split())
+
+
+def _cast_names(meta: dict) -> list:
+    names = []
+    for member in meta.get('cast') or []:
+        if isinstance(member, str):
+            names.append(member)
+        elif isinstance(member, dict):
+            names.append(member.get('name', ''))
+    return [n for n in (normalize_person_name(n) for n in names) if n]
+
+
+def record_cast(content_type: str, meta: dict, content_id: str = None):
+    """Remember a meta's cast in memory and persist it in the background"""
+    content_id = content_id or meta.get('imdb_id') or meta.get('id')
+    if not content_id or 'cast' not in meta:
+        return
+    cast = _cast_names(meta)
+    if _cached_cast(content_id) == cast:
+        return
+    _remember_cast(content_id, cast, time.time())
+
+    async def persist():
+        try:
+            await db.cast_index.update_one(
+                {"id": content_id},
+                {"$set": {"type": content_type, "cast": cast, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.debug(f"Cast index write failed for {content_id}: {e}")
+    spawn_background(persist())
+
+
+def cast_matches(actor_name: str, cast: list) -> bool:
+    """True if actor_name is one of the (normalized) cast names"""
+    actor = normalize_person_name(actor_name)
+    actor_parts = actor.split()
     
-    # Check cache first
-    cache_key = current_user.id
+    # For person searches, require at least first and last name
+    if len(actor_parts) < 2:
+        return False
+    first_name = actor_parts[0]
+    last_name = actor_parts[-1]
+    
+    for cast_name in cast:
+        # Require exact match on full name
+        if actor == cast_name:
+            return True
+        
+        # Or match if first name AND last name both appear in cast member name
+        # This handles "David Harbour" matching "David K. Harbour" or similar
+        cast_parts = cast_name.split()
+        first_match = first_name in cast_parts or any(p.startswith(first_name) for p in cast_parts)
+        last_match = last_name in cast_parts or any(p.startswith(last_name) for p in cast_parts)
+        
+        # The cast member name must be similar length (to avoid "David" matching "David Holmes")
+        if first_match and last_match and len(cast_parts) <= len(actor_parts) + 1:
+            return True
+    return False
+
+
+async def load_cast(items: list) -> Dict[str, list]:
+    """Cast lists for [(content_type, content_id)]: memory, then Mongo, then Cinemeta.
+    Only IDs the index has never seen are fetched."""
+    global _cast_fetch_semaphore
+    result = {}
+    for _, cid in items:
+        cast = _cached_cast(cid)
+        if cast is not None:
+            result[cid] = cast
+    missing = [(ctype, cid) for ctype, cid in items if cid not in result]
+    
+    if missing:
+        try:
+            docs = await db.cast_index.find(
+                {"id": {"$in": [cid for _, cid in missing]}}, {"_id": 0, "id": 1, "cast": 1, "updated_at": 1}
+            ).to_list(len(missing))
+            for doc in docs:
+                age = (datetime.utcnow() - doc["updated_at"]).total_seconds() if doc.get("updated_at") else CAST_EMPTY_TTL + 1
+                _remember_cast(doc["id"], doc.get("cast", []), time.time() - age)
+                cast = _cached_cast(doc["id"])
+                if cast is not None:
+                    result[doc["id"]] = cast
+        except Exception as e:
+            logger.warning(f"Cast index read failed: {e}")
+        missing = [(ctype, cid) for ctype, cid in missing if cid not in result]
+    
+    if missing:
+        if _cast_fetch_semaphore is None:
+            _cast_fetch_semaphore = asyncio.Semaphore(CAST_FETCH_CONCURRENCY)
+        client = await get_shared_http_client()
+        
+        async def fetch(ctype: str, cid: str):
+            async with _cast_fetch_semaphore:
+                try:
+                    response = await client.get(f"https://v3-cinemeta.strem.io/meta/{ctype}/{cid}.json", timeout=8.0)
+                    if response.status_code == 200:
+                        meta = response.json().get('meta') or {}
+                        meta.setdefault('cast', [])
+                        record_cast(ctype, meta, cid)
+                        result[cid] = _cached_cast(cid) or []
+                except Exception as e:
+                    logger.debug(f"Error fetching cast for {cid}: {e}")
+        
+        await asyncio.gather(*[fetch(ctype, cid) for ctype, cid in missing])
+        logger.info(f"Cast index: fetched {len(missing)} unknown metas, {len(items) - len(missing)} served locally")
+    return result
+
+
+# ==================== STREAM AVAILABILITY INDEX ====================
+# Last-known stream count per title, persisted in stream_availability.  Fed by
+# every get_all_streams result and refreshed lazily in the background, so
+# search filters on local data instead of probing third parties per result.
+# Series are keyed by their base ID (any episode with streams counts).
+
+AVAILABILITY_TTL = 24 * 3600  # a known count is trusted this long
+AVAILABILITY_OPTIMISTIC_TTL = 600  # unknown titles are shown for this long while a probe runs
+AVAILABILITY_PROBE_CONCURRENCY = 4
+AVAILABILITY_CACHE_MAX_ENTRIES = 20000
+AVAILABILITY_ZERO_CONFIRMATIONS = 2  # empty results in a row before a title that had streams is hidden
+
+_availability_cache: Dict[str, Dict[str, Any]] = {}  # {content_id: {"count": int|None, "checked_at": float, "zeros": int}}
+_availability_probes_inflight: set = set()
+_availability_probe_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _remember_availability(content_id: str, count: Optional[int], checked_at: float):
+    if len(_availability_cache) >= AVAILABILITY_CACHE_MAX_ENTRIES and content_id not in _availability_cache:
+        _availability_cache.pop(next(iter(_availability_cache)))
+    _availability_cache[content_id] = {"count": count, "checked_at": checked_at}
+
+
+def record_stream_availability(content_type: str, content_id: str, count: int):
+    """Store a title's stream count (memory now, Mongo in the background).
+    A positive count is only replaced by AVAILABILITY_ZERO_CONFIRMATIONS
+    empty results in a row - and never by one empty series episode."""
+    key = content_id.split(':')[0] if content_type == 'series' else content_id
+    now = time.time()
+    entry = _availability_cache.get(key)
+    if count == 0 and entry and entry.get("count"):
+        entry["zeros"] = entry.get("zeros", 0) + 1
+        if content_type != 'series' and entry["zeros"] >= AVAILABILITY_ZERO_CONFIRMATIONS:
+            _remember_availability(key, 0, now)
+    else:
+        _remember_availability(key, count, now)
+
+    if count:
+        update = {"$set": {"type": content_type, "count": count, "zeros": 0, "checked_at": datetime.utcfromtimestamp(now)}}
+    else:
+        # The same rule against the persisted count, which another worker may have written
+        had_streams = {"$gt": [{"$ifNull": ["$count", 0]}, 0]}
+        keep = had_streams if content_type == 'series' else \
+            {"$and": [had_streams, {"$lt": ["$zeros", AVAILABILITY_ZERO_CONFIRMATIONS]}]}
+        update = [
+            {"$set": {"type": content_type, "zeros": {"$add": [{"$ifNull": ["$zeros", 0]}, 1]}}},
+            {"$set": {
+                "count": {"$cond": [keep, "$count", 0]},
+                "checked_at": {"$cond": [keep, "$checked_at", datetime.utcfromtimestamp(now)]},
+            }},
+        ]
+
+    async def persist():
+        try:
+            await db.stream_availability.update_one({"id": key}, update, upsert=True)
+        except Exception as e:
+            logger.debug(f"Availability write failed for {key}: {e}")
+    spawn_background(persist())
+
+
+async def check_has_streams(content_type: str, content_id: str) -> Optional[bool]:
+    """Quick check if content has any streams available (None if no source answered)"""
+    answered = False
+    try:
+        client = await get_shared_http_client()
+        # Try ApiBay (The Pirate Bay) - fast and usually available
+        if content_type == 'movie':
+            # Check via a quick ApiBay search using the IMDB ID
+            try:
+                response = await client.get("https://apibay.org/q.php", params={"q": content_id}, timeout=4.0)
+                if response.status_code == 200:
+                    answered = True
+                    results = response.json()
+                    # Check if we got real results (not "No results")
+                    if isinstance(results, list) and len(results) > 0 and results[0].get('id') != '0':
+                        return True
+            except Exception:
+                pass
+        
+        # Try 1337x addon as backup
+        try:
+            response = await client.get(f"https://1337x-api.strem.fun/stream/{content_type}/{content_id}.json", timeout=4.0)
+            if response.status_code == 200:
+                answered = True
+                if response.json().get('streams'):
+                    return True
+        except Exception:
+            pass
+        
+        # For series, assume most popular series have streams
+        if content_type == 'series':
+            return True  # Most series in Cinemeta have streams available
+    except Exception:
+        pass
+    return False if answered else None
+
+
+async def _probe_availability(content_type: str, content_id: str):
+    global _availability_probe_semaphore
+    if _availability_probe_semaphore is None:
+        _availability_probe_semaphore = asyncio.Semaphore(AVAILABILITY_PROBE_CONCURRENCY)
+    try:
+        async with _availability_probe_semaphore:
+            # For series, check first episode of first season
+            probe_id = f"{content_id}:1:1" if content_type == 'series' else content_id
+            has_streams = await check_has_streams(content_type, probe_id)
+        if has_streams is not None:
+            record_stream_availability(content_type, content_id, 1 if has_streams else 0)
+    finally:
+        _availability_probes_inflight.discard(content_id)
+
+
+async def filter_by_availability(content_type: str, items: list) -> list:
+    """Drop items the index knows have no streams.  Unknown or stale titles are
+    kept (optimistic default) and re-probed in the background."""
+    ids = [i.get('imdb_id') or i.get('id') for i in items]
+    missing = [cid for cid in ids if cid and cid not in _availability_cache]
+    if missing:
+        try:
+            docs = await db.stream_availability.find(
+                {"id": {"$in": missing}}, {"_id": 0, "id": 1, "count": 1, "checked_at": 1}
+            ).to_list(len(missing))
+            for doc in docs:
+                checked_at = doc.get("checked_at")
+                _remember_availability(doc["id"], doc.get("count"), checked_at.timestamp() if checked_at else 0)
+        except Exception as e:
+            logger.warning(f"Availability read failed: {e}")
+
+    now = time.time()
+    kept = []
+    for item, cid in zip(items, ids):
+        if not cid:
+            continue
+        entry = _availability_cache.get(cid)
+        age = now - entry["checked_at"] if entry else None
+        if entry and entry["count"] is not None and age < AVAILABILITY_TTL:
+            if entry["count"] > 0:
+                kept.append(item)
+            continue
+        kept.append(item)
+        if entry and entry["count"] is None and age < AVAILABILITY_OPTIMISTIC_TTL:
+            continue  # optimistic placeholder - a probe is already on its way
+        if cid not in _availability_probes_inflight:
+            _availability_probes_inflight.add(cid)
+            if not entry or entry["count"] is None:
+                _remember_availability(cid, None, now)
+            spawn_background(_probe_availability(content_type, cid))
+    return kept
+
+
+# ==================== LOCAL SEARCH INDEX ====================
+# In-process inverted index over every movie/series meta the server has seen
+# (discover snapshots, category pages, metas, remote search results).  Names
+# are split into words and the word vocabulary is indexed by padded trigrams,
+# so a query word matches exactly, by prefix (search-as-you-type) or with a
+# small typo.  Search answers from here first and merges Cinemeta results.
+
+SEARCH_INDEX_MAX_ENTRIES = 50000
+# Common words to ignore when matching
+SEARCH_STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'of', 'in', 'on', 'at', 'to', 'for', 'is', 'it'}
+SEARCH_LOCAL_ONLY_CHARS = 4  # shorter queries never wait on Cinemeta
+SEARCH_LOCAL_SUFFICIENT = 8  # this many strong local hits skip the remote wait
+SEARCH_INDEX_FIELDS = ('id', 'imdb_id', 'type', 'name', 'poster', 'background', 'logo',
+                       'releaseInfo', 'year', 'genres', 'genre', 'imdbRating', 'description', 'runtime')
+
+_remote_search_inflight: Dict[str, dict] = {}  # {query: {"task": Task, "waiters": int}}
+
+# Search-as-you-type sessions: {f"{user_id}:{session}": {"task", "results", "touched"}}
+_search_sessions: Dict[str, dict] = {}
+SEARCH_SESSION_TTL = 300
+SEARCH_SESSIONS_MAX = 2000
+CINEMETA_SEARCH_PAGE_SIZE = 100  # a search catalog this long may have been cut off
+
+
+def _word_grams(word: str, prefix: bool = False) -> set:
+    padded = f"$${word}" if prefix else f"$${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def meta_matches_filters(meta: dict, genre: str = None, year: int = None) -> bool:
+    if genre:
+        genres = meta.get('genres') or meta.get('genre') or []
+        if genre.lower() not in (g.lower() for g in genres if isinstance(g, str)):
+            return False
+    if year:
+        released = str(meta.get('releaseInfo') or meta.get('year') or '')
+        if not released.startswith(str(year)):
+            return False
+    return True
+
+
+class SearchIndex:
+    """Prefix- and typo-tolerant title index; per worker, bounded, FIFO-evicted"""
+
+    def __init__(self, max_entries: int = SEARCH_INDEX_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.docs: Dict[str, dict] = {}  # {id: slim meta}
+        self.doc_words: Dict[str, tuple] = {}  # {id: normalized name words}
+        self.words: Dict[str, set] = {}  # {word: {ids}}
+        self.grams: Dict[str, set] = {}  # {trigram: {words}}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, meta: dict, content_type: str = None):
+        content_type = content_type or meta.get('type')
+        content_id = meta.get('imdb_id') or meta.get('id')
+        name = meta.get('name')
+        if content_type not in ('movie', 'series') or not content_id or not name:
+            return
+        doc = {k: meta[k] for k in SEARCH_INDEX_FIELDS if meta.get(k) is not None}
+        doc['type'] = content_type
+        words = tuple(normalize_person_name(name).split())
+        if content_id in self.docs:
+            self.docs[content_id] = doc
+            if self.doc_words[content_id] == words:
+                return
+            self._unindex(content_id)
+        elif len(self.docs) >= self.max_entries:
+            oldest = next(iter(self.docs))
+            self._unindex(oldest)
+            del self.docs[oldest]
+        self.docs[content_id] = doc
+        self.doc_words[content_id] = words
+        for word in set(words):
+            if word not in self.words:
+                self.words[word] = set()
+                for gram in _word_grams(word):
+                    self.grams.setdefault(gram, set()).add(word)
+            self.words[word].add(content_id)
+
+    def add_many(self, metas: list, content_type: str = None):
+        for meta in metas or []:
+            if isinstance(meta, dict):
+                self.add(meta, content_type)
+
+    def _unindex(self, content_id: str):
+        for word in set(self.doc_words.pop(content_id, ())):
+            ids = self.words.get(word)
+            if ids is None:
+                continue
+            ids.discard(content_id)
+            if not ids:
+                del self.words[word]
+                for gram in _word_grams(word):
+                    bucket = self.grams.get(gram)
+                    if bucket is not None:
+                        bucket.discard(word)
+                        if not bucket:
+                            del self.grams[gram]
+
+    def _expand(self, query_word: str, prefix: bool) -> Dict[str, float]:
+        """Vocabulary words matching query_word -> match weight"""
+        matches = {}
+        if query_word in self.words:
+            matches[query_word] = 1.0
+        if prefix:
+            candidates = None
+            for gram in _word_grams(query_word, prefix=True):
+                bucket = self.grams.get(gram, set())
+                candidates = bucket if candidates is None else candidates & bucket
+                if not candidates:
+                    break
+            for word in candidates or ():
+                if word.startswith(query_word) and word not in matches:
+                    matches[word] = 0.9
+        if len(query_word) >= 4:
+            limit = 1 if len(query_word) <= 6 else 2
+            query_grams = _word_grams(query_word)
+            overlap: Dict[str, int] = {}
+            for gram in query_grams:
+                for word in self.grams.get(gram, ()):
+                    overlap[word] = overlap.get(word, 0) + 1
+            threshold = max(1, len(query_grams) - 3 * limit)
+            for word, shared in overlap.items():
+                if word in matches or shared < threshold:
+                    continue
+                # Prefix typos ("strnger thi") compare against the word's head
+                target = word[:len(query_word)] if prefix and len(word) > len(query_word) else word
+                if _edit_distance(query_word, target, limit) <= limit:
+                    matches[word] = 0.7
+        return matches
+
+    def search(self, query: str, content_type: str = None, genre: str = None,
+               year: int = None, limit: int = 30) -> List[tuple]:
+        """[(meta, score)] best first; score uses the same 0-100 scale as search scoring"""
+        normalized = normalize_person_name(query)
+        query_words = normalized.split()
+        if not query_words:
+            return []
+        significant = [w for w in query_words if w not in SEARCH_STOP_WORDS] or query_words
+        ends_with_space = query.endswith(' ')
+        scores: Optional[Dict[str, float]] = None
+        for position, word in enumerate(significant):
+            is_last = position == len(significant) - 1 and significant[-1] == query_words[-1]
+            word_scores: Dict[str, float] = {}
+            for vocab_word, weight in self._expand(word, prefix=is_last and not ends_with_space).items():
+                for content_id in self.words.get(vocab_word, ()):
+                    if weight > word_scores.get(content_id, 0):
+                        word_scores[content_id] = weight
+            # Every significant word must match something
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {cid: s + word_scores[cid] for cid, s in scores.items() if cid in word_scores}
+            if not scores:
+                return []
+
+        results = []
+        for content_id, total in scores.items():
+            meta = self.docs[content_id]
+            if content_type and meta.get('type') != content_type:
+                continue
+            if not meta_matches_filters(meta, genre, year):
+                continue
+            name = ' '.join(self.doc_words[content_id])
+            if name == normalized:
+                score = 100
+            elif name.startswith(normalized):
+                score = 95
+            elif normalized in name:
+                score = 90
+            else:
+                quality = total / len(significant)  # 1.0 exact ... 0.7 typo
+                length_bonus = max(0, 20 - len(self.doc_words[content_id]))
+                base = 80 if quality >= 0.9 else 60
+                score = min(base + 9, base + length_bonus * quality / 2)
+            results.append((meta, score))
+        results.sort(key=lambda r: (-r[1], -float(r[0].get('imdbRating') or 0)))
+        return results[:limit]
+
+
+search_index = SearchIndex()
+
+
+def _prune_search_sessions():
+    cutoff = time.time() - SEARCH_SESSION_TTL
+    for key in [k for k, v in _search_sessions.items() if v.get("touched", 0) < cutoff]:
+        _search_sessions.pop(key, None)
+    while len(_search_sessions) >= SEARCH_SESSIONS_MAX:
+        _search_sessions.pop(next(iter(_search_sessions)))
+
+
+async def fetch_cinemeta_search(q: str) -> tuple:
+    """(movies, series) from Cinemeta's search catalogs (None for a catalog that
+    did not answer); results feed the local index.  Concurrent identical queries share one upstream round trip, which
+    is cancelled once every caller waiting on it has been cancelled."""
+    key = q.lower().strip()
+    entry = _remote_search_inflight.get(key)
+    if entry is None:
+        async def run():
+            try:
+                client = await get_shared_http_client()
+                encoded_q = q.replace(' ', '%20')
+                movie_resp, series_resp = await asyncio.gather(
+                    client.get(f"https://v3-cinemeta.strem.io/catalog/movie/top/search={encoded_q}.json", timeout=15.0),
+                    client.get(f"https://v3-cinemeta.strem.io/catalog/series/top/search={encoded_q}.json", timeout=15.0),
+                    return_exceptions=True
+                )
+                movies = None
+                series = None
+                if not isinstance(movie_resp, Exception) and movie_resp.status_code == 200:
+                    movies = movie_resp.json().get('metas', [])
+                if not isinstance(series_resp, Exception) and series_resp.status_code == 200:
+                    series = series_resp.json().get('metas', [])
+                search_index.add_many(movies or [], 'movie')
+                search_index.add_many(series or [], 'series')
+                return movies, series
+            finally:
+                _remote_search_inflight.pop(key, None)
+        entry = {"task": asyncio.create_task(run()), "waiters": 0}
+        _remote_search_inflight[key] = entry
+    entry["waiters"] += 1
+    try:
+        return await asyncio.shield(entry["task"])
+    except asyncio.CancelledError:
+        # Abandoned by a superseded search: stop the upstream requests too,
+        # unless another caller is still waiting on them
+        if entry["waiters"] == 1:
+            entry["task"].cancel()
+        raise
+    finally:
+        entry["waiters"] -= 1
+
+
+# ==================== GENRE CATALOG CACHE ====================
+# Cinemeta genre pages (top/genre=X/skip=N) are the same for every user, so
+# they are cached in _discover_cache keyed by (type, genre, skip), fetched
+# once per key at a time, and the following page is prefetched in the
+# background while the user looks at the current one.
+
+GENRE_PAGE_TTL = 1800  # 30 minutes
+
+_genre_page_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _genre_page_url(content_type: str, genre: str, skip: int) -> str:
+    # Format: /catalog/{type}/top/genre={genre}/skip={skip}.json
+    if skip > 0:
+        return f"https://v3-cinemeta.strem.io/catalog/{content_type}/top/genre={genre}/skip={skip}.json"
+    return f"https://v3-cinemeta.strem.io/catalog/{content_type}/top/genre={genre}.json"
+
+
+async def get_genre_page(content_type: str, genre: str, skip: int = 0, prefetch_skip: Optional[int] = None) -> list:
+    """Metas of one Cinemeta genre catalog page, cached for every user.
+    prefetch_skip is the page the client will ask for next."""
+    cache_key = f"genre:{content_type}:{genre}:{skip}"
     cached = _discover_cache.get(cache_key)
     if cached and cached["expires"] > datetime.utcnow():
-        logger.info(f"Discover cache HIT for user {current_user.username}")
         return cached["data"]
     
-    logger.info(f"Discover cache MISS - fetching fresh data for {current_user.username}")
-    
-    addons = await db.addons.find({"userId": current_user.id}).sort("installedAt", 1).to_list(100)
-    
-    result = {
-        "continueWatching": [],
-        "services": {}
-    }
-    
-    if not addons:
-        logger.info("No addons installed for user - returning empty discover")
+    task = _genre_page_inflight.get(cache_key)
+    if task is None:
+        async def fetch() -> list:
+            try:
+                client = await get_shared_http_client()
+                url = _genre_page_url(content_type, genre, skip)
+                logger.info(f"Fetching genre catalog: {url}")
+                response = await client.get(url, timeout=20.0)
+                if response.status_code != 200:
+                    return []
+                metas = response.json().get('metas', [])
+                _discover_cache[cache_key] = {
+                    "data": metas,
+                    "expires": datetime.utcnow() + timedelta(seconds=GENRE_PAGE_TTL)
+                }
+                search_index.add_many(metas, content_type)
+                return metas
+            finally:
+                _genre_page_inflight.pop(cache_key, None)
+        task = asyncio.create_task(fetch())
+        _genre_page_inflight[cache_key] = task
+    metas = await asyncio.shield(task)
+    
+    if prefetch_skip is not None and metas:
+        spawn_background(get_genre_page(content_type, genre, prefetch_skip))
+    return metas
+
+
+# ==================== COMPACT META CACHE ====================
+# Metas are cached as CompactMeta: the top-level fields with short strings
+# interned, and a series' episodes bucketed by season as tuples.  Episode
+# dicts are only built for what a response asks for (?fields=, ?season=).
+
+META_CACHE_TTL = 600  # 10 minutes
+
+
+def _intern_value(value):
+    if isinstance(value, str) and len(value) <= 64:
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern_value(v) for v in value]
+    return value
+
+
+class CompactMeta:
+    """Cached form of a meta; project() builds the response dict"""
+    __slots__ = ('base', 'seasons')
+
+    def __init__(self, meta: dict, content_type: str):
+        bucket_videos = content_type == 'series' and 'videos' in meta
+        self.base = {sys.intern(k): _intern_value(v) for k, v in meta.items()
+                     if not (bucket_videos and k == 'videos')}
+        self.seasons: Optional[Dict[int, list]] = None
+        if bucket_videos:
+            self.seasons = {}
+            for video in meta.get('videos') or []:
+                episode = video.get('episode', 0)
+                self.seasons.setdefault(video.get('season', 0), []).append((
+                    video.get('id', ''),
+                    episode,
+                    video.get('name') or video.get('title', f"Episode {episode}"),
+                    video.get('thumbnail'),
+                    video.get('overview'),
+                    _intern_value(video.get('released')),
+                ))
+
+    def episodes(self, season: Optional[int] = None) -> list:
+        buckets = [(season, self.seasons.get(season, []))] if season is not None else self.seasons.items()
+        return [
+            {'id': vid, 'season': s, 'episode': ep, 'name': name,
+             'thumbnail': thumb, 'overview': overview, 'released': released}
+            for s, rows in buckets
+            for vid, ep, name, thumb, overview, released in rows
+        ]
+
+    def project(self, fields: Optional[set] = None, season: Optional[int] = None) -> dict:
+        result = {k: v for k, v in self.base.items() if fields is None or k in fields}
+        if self.seasons is not None and (fields is None or 'videos' in fields):
+            result['videos'] = self.episodes(season)
+        if self.seasons is not None and (season is not None or (fields and 'seasons' in fields)):
+            result['seasons'] = sorted(self.seasons)
         return result
-    
-    logger.info(f"Processing {len(addons)} installed addons for discover")
-    
-    # Service ID to display name mapping for Streaming Catalogs addon
-    service_names = {
-        'nfx': 'Netflix', 'dnp': 'Disney+', 'amp': 'Prime Video', 'hbm': 'HBO Max',
-        'hlu': 'Hulu', 'pmp': 'Paramount+', 'atp': 'Apple TV+', 'pcp': 'Peacock', 'dpe': 'Discovery+'
+
+
+# ==================== RESPONSE PAYLOADS ====================
+# Large cached JSON responses (discover, streams, meta) keep a CachedPayload
+# next to their data: the body is serialized and hashed once when the cache
+# entry is filled (a cache hit sends those bytes as-is, no re-encoding), and
+# gzip/brotli encodings are built on first demand and kept with it.
+# payload_response() answers If-None-Match with 304 and otherwise sends the
+# best encoding the client accepts.  Routes returning plain dicts still go
+# through FastAPI's jsonable_encoder; ORJSONResponse only replaces the final
+# json.dumps step.
+
+COMPRESS_MIN_BYTES = 1024
+
+
+def dumps_json(data: Any) -> bytes:
+    """Serialize to compact JSON bytes - orjson when available (several times faster)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+
+class CachedPayload:
+    """A JSON body with its strong validator and compressed encodings"""
+    __slots__ = ('body', 'digest', '_encoded')
+
+    def __init__(self, data: Any):
+        self.body = dumps_json(data)
+        self.digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        # Each content-coding is its own representation, so its own strong ETag
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def encoded(self, encoding: str) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == 'br':
+                body = brotli.compress(self.body, quality=5)
+            else:
+                body = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = body
+        return body
+
+
+def _negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = {}
+    for part in request.headers.get('accept-encoding', '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    if BROTLI_AVAILABLE and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def payload_response(request: Request, payload: CachedPayload) -> Response:
+    """304 if the client already has this payload, else its (compressed) body"""
+    encoding = _negotiate_encoding(request) if len(payload.body) >= COMPRESS_MIN_BYTES else None
+    headers = {
+        "ETag": payload.etag(encoding),
+        "Vary": "Accept-Encoding, Authorization",
+        "Cache-Control": "private, no-cache",
     }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == '*' or tag.strip('"').split('-')[0] == payload.digest:
+                return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(content=payload.encoded(encoding), media_type="application/json", headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+
+# ==================== CONTENT ROUTES ====================
+
+# ==================== DISCOVER ====================
+# Discover is assembled from a plan of catalog fetches (one per section
+# catalog of every installed addon).  Catalog pages are cached per URL for
+# every user, served stale while they refresh, and fetched once at a time.
+# With ?progressive=true the page returns whatever is ready within
+# DISCOVER_FIRST_PHASE_BUDGET and lists the remaining sections under
+# "pending"; the client loads those from /content/discover/section/{id}.
+# Progressive responses also carry "sections": per section name, the
+# catalog ids it was built from and when its oldest catalog was fetched.
+# That bookkeeping is kept beside "services", never inside it, so the
+# services payload stays what clients have always received.
+
+DISCOVER_FIRST_PHASE_BUDGET = 2.5  # seconds
+DISCOVER_CATALOG_STALE_TTL = 3600  # stale catalogs are still served (and refreshed) for this long
+
+_discover_catalog_inflight: Dict[str, asyncio.Task] = {}
+
+# Service ID to display name mapping for Streaming Catalogs addon
+DISCOVER_SERVICE_NAMES = {
+    'nfx': 'Netflix', 'dnp': 'Disney+', 'amp': 'Prime Video', 'hbm': 'HBO Max',
+    'hlu': 'Hulu', 'pmp': 'Paramount+', 'atp': 'Apple TV+', 'pcp': 'Peacock', 'dpe': 'Discovery+'
+}
+
+DISCOVER_CINEMETA_FETCH = [
+    ('movie', 'top', 'Popular Movies'),
+    ('series', 'top', 'Popular Series'),
+    ('movie', 'year', 'New Movies', 'genre=2025'),
+    ('series', 'year', 'New Series', 'genre=2025'),
+]
+
+
+def build_discover_plan(addons: list) -> list:
+    """One entry per catalog fetch: {"id", "url", "section", "type", "source", ...}"""
+    plan = []
     
-    cinemeta_fetch = [
-        ('movie', 'top', 'Popular Movies'),
-        ('series', 'top', 'Popular Series'),
-        ('movie', 'year', 'New Movies', 'genre=2025'),
-        ('series', 'year', 'New Series', 'genre=2025'),
-    ]
-    
-    # Build list of ALL fetch tasks to run in parallel
-    fetch_tasks = []
-    task_metadata = []  # Track what each task is for
-    
-    http_client = await get_shared_http_client()
-    
-    async def fetch_catalog(url: str) -> list:
-        """Fetch a single catalog URL and return metas"""
-        try:
-            response = await http_client.get(url)
-            if response.status_code == 200:
-                return response.json().get('metas', [])
-        except Exception as e:
-            logger.warning(f"Fetch failed for {url}: {e}")
-        return []
+    def add(url: str, section: str, catalog_type: str, source: str, **extra):
+        section_id = hashlib.md5(url.encode()).hexdigest()[:12]
+        plan.append({"id": section_id, "url": url, "section": section, "type": catalog_type, "source": source, **extra})
     
     for addon in addons:
         manifest = addon.get('manifest', {})
@@ -2657,7 +3293,7 @@ async def get_discover(current_user: User = Depends(get_current_user)):
         
         # Handle Cinemeta addon
         if 'cinemeta' in addon_id:
-            for fetch_config in cinemeta_fetch:
+            for fetch_config in DISCOVER_CINEMETA_FETCH:
                 catalog_type = fetch_config[0]
                 catalog_id = fetch_config[1]
                 section_name = fetch_config[2]
@@ -2667,48 +3303,28 @@ async def get_discover(current_user: User = Depends(get_current_user)):
                     url = f"{base_url}/catalog/{catalog_type}/{catalog_id}/{extra_param}.json"
                 else:
                     url = f"{base_url}/catalog/{catalog_type}/{catalog_id}.json"
-                
-                fetch_tasks.append(fetch_catalog(url))
-                task_metadata.append({
-                    "section": section_name,
-                    "type": catalog_type,
-                    "source": "cinemeta"
-                })
+                add(url, section_name, catalog_type, "cinemeta")
         
         # Handle Streaming Catalogs addon
         elif 'netflix-catalog' in addon['manifestUrl'].lower() or 'streaming-catalogs' in addon_id:
             for catalog in catalogs:
                 catalog_type = catalog.get('type', '')
                 catalog_id = catalog.get('id', '')
-                service_name = service_names.get(catalog_id)
+                service_name = DISCOVER_SERVICE_NAMES.get(catalog_id)
                 
                 if not service_name or catalog_type not in ['movie', 'series']:
                     continue
                 
-                url = f"{base_url}/catalog/{catalog_type}/{catalog_id}.json"
                 type_label = 'Movies' if catalog_type == 'movie' else 'Series'
-                section_name = f"{service_name} {type_label}"
-                
-                fetch_tasks.append(fetch_catalog(url))
-                task_metadata.append({
-                    "section": section_name,
-                    "type": catalog_type,
-                    "source": "streaming"
-                })
+                add(f"{base_url}/catalog/{catalog_type}/{catalog_id}.json",
+                    f"{service_name} {type_label}", catalog_type, "streaming")
         
         # Handle USA TV addon
         elif 'usatv' in addon['manifestUrl'].lower() or 'usatv' in addon_id:
             for catalog in catalogs:
                 if catalog.get('type') == 'tv':
                     catalog_id = catalog.get('id', 'usatv')
-                    url = f"{base_url}/catalog/tv/{catalog_id}.json"
-                    
-                    fetch_tasks.append(fetch_catalog(url))
-                    task_metadata.append({
-                        "section": "USA TV Channels",
-                        "type": "tv",
-                        "source": "usatv"
-                    })
+                    add(f"{base_url}/catalog/tv/{catalog_id}.json", "USA TV Channels", "tv", "usatv")
                     break
         
         # Generic addon handling
@@ -2721,75 +3337,207 @@ async def get_discover(current_user: User = Depends(get_current_user)):
                 if not catalog_type or not catalog_id:
                     continue
                 
-                url = f"{base_url}/catalog/{catalog_type}/{catalog_id}.json"
-                
-                fetch_tasks.append(fetch_catalog(url))
-                task_metadata.append({
-                    "section": catalog_name,
-                    "type": catalog_type,
-                    "source": "generic",
-                    "catalog_id": catalog_id,
-                    "base_url": base_url
-                })
-    
-    # FIRE ALL FETCHES IN PARALLEL
+                add(f"{base_url}/catalog/{catalog_type}/{catalog_id}.json", catalog_name, catalog_type, "generic",
+                    catalog_id=catalog_id, base_url=base_url)
+    return plan
+
+
+async def fetch_discover_catalog(url: str) -> dict:
+    """{"metas", "fetched_at"} for a catalog URL; stale entries are returned
+    immediately and refreshed in the background"""
+    cache_key = f"catalog:{url}"
+    cached = _discover_cache.get(cache_key)
+    now = datetime.utcnow()
+    
+    task = _discover_catalog_inflight.get(cache_key)
+    if task is None and not (cached and cached["expires"] > now):
+        async def fetch() -> dict:
+            try:
+                http_client = await get_shared_http_client()
+                response = await http_client.get(url)
+                if response.status_code != 200:
+                    raise ValueError(f"HTTP {response.status_code}")
+                entry = {"metas": response.json().get('metas', []), "fetched_at": datetime.utcnow()}
+                _discover_cache[cache_key] = {
+                    "data": entry,
+                    "expires": entry["fetched_at"] + timedelta(seconds=DISCOVER_CACHE_TTL)
+                }
+                return entry
+            except Exception as e:
+                logger.warning(f"Fetch failed for {url}: {e}")
+                # Keep serving what we had, if anything
+                stale = _discover_cache.get(cache_key)
+                return stale["data"] if stale else {"metas": [], "fetched_at": None}
+            finally:
+                _discover_catalog_inflight.pop(cache_key, None)
+        task = asyncio.create_task(fetch())
+        _discover_catalog_inflight[cache_key] = task
+    
+    if cached and cached["expires"] + timedelta(seconds=DISCOVER_CATALOG_STALE_TTL) > now:
+        return cached["data"]
+    return await asyncio.shield(task)
+
+
+def add_discover_section(result: dict, entry: dict, catalog: dict, sections: Optional[dict] = None):
+    """Merge one fetched catalog into the discover result's services, and
+    record its id and freshness in sections when given"""
+    metas = catalog["metas"]
+    section_name = entry["section"]
+    catalog_type = entry["type"]
+    
+    # For generic addons, limit to 30 items and filter
+    if entry["source"] == "generic":
+        metas = metas[:30]
+        metas = [m for m in metas if m.get('name') and m.get('id')]
+    
+    if not metas:
+        return
+    
+    if section_name not in result['services']:
+        result['services'][section_name] = {'movies': [], 'series': [], 'channels': []}
+        if entry["source"] == "generic":
+            result['services'][section_name]['_catalog_id'] = entry.get('catalog_id', '')
+            result['services'][section_name]['_base_url'] = entry.get('base_url', '')
+    service = result['services'][section_name]
+    
+    if sections is not None:
+        section = sections.setdefault(section_name, {"ids": [], "fetchedAt": None})
+        section["ids"].append(entry["id"])
+        # Freshness: the oldest catalog in the section
+        fetched_at = catalog.get("fetched_at")
+        if fetched_at:
+            stamp = fetched_at.isoformat() + 'Z'
+            if section["fetchedAt"] is None or stamp < section["fetchedAt"]:
+                section["fetchedAt"] = stamp
+    
+    search_index.add_many(metas, catalog_type)
+    
+    if catalog_type == 'movie':
+        service['movies'].extend(metas)
+    elif catalog_type == 'series':
+        service['series'].extend(metas)
+    elif catalog_type == 'tv':
+        service['channels'].extend(metas)
+    
+    logger.info(f"{entry['source']}: {len(metas)} items for {section_name}")
+
+
+@api_router.get("/content/discover-organized")
+async def get_discover(request: Request, progressive: bool = False, current_user: User = Depends(get_current_user)):
+    """Get discover page content from installed addons - organized by service.
+    Uses parallel fetching and in-memory caching for speed.  progressive=true
+    returns the sections ready within the first-phase budget plus "pending"."""
+    
+    # Check cache first
+    cache_key = current_user.id
+    cached = _discover_cache.get(cache_key)
+    if cached and cached["expires"] > datetime.utcnow():
+        logger.info(f"Discover cache HIT for user {current_user.username}")
+        if not progressive:
+            return payload_response(request, cached["payload"])
+        if "progressive_payload" not in cached:
+            cached["progressive_payload"] = CachedPayload({**cached["data"], "sections": cached["sections"]})
+        return payload_response(request, cached["progressive_payload"])
+    
+    logger.info(f"Discover cache MISS - fetching fresh data for {current_user.username}")
+    
+    addons = await db.addons.find({"userId": current_user.id}).sort("installedAt", 1).to_list(100)
+    
+    result = {
+        "continueWatching": [],
+        "services": {}
+    }
+    
+    if not addons:
+        logger.info("No addons installed for user - returning empty discover")
+        return payload_response(request, CachedPayload({**result, "sections": {}} if progressive else result))
+    
+    logger.info(f"Processing {len(addons)} installed addons for discover")
+    
+    plan = build_discover_plan(addons)
+    
+    # FIRE ALL FETCHES IN PARALLEL (shared per-URL catalog cache)
     start_time = time.time()
-    logger.info(f"Firing {len(fetch_tasks)} catalog fetches in parallel...")
-    all_results = await asyncio.gather(*fetch_tasks, return_exceptions=True)
+    logger.info(f"Firing {len(plan)} catalog fetches in parallel...")
+    tasks = [asyncio.create_task(fetch_discover_catalog(entry["url"])) for entry in plan]
+    if progressive:
+        await asyncio.wait(tasks, timeout=DISCOVER_FIRST_PHASE_BUDGET)
+    else:
+        await asyncio.wait(tasks)
     elapsed = time.time() - start_time
-    logger.info(f"All {len(fetch_tasks)} fetches completed in {elapsed:.2f}s")
     
-    # Process results
-    for i, metas_result in enumerate(all_results):
-        if isinstance(metas_result, Exception):
-            logger.warning(f"Task {i} failed: {metas_result}")
-            continue
-        
-        metas = metas_result
-        meta = task_metadata[i]
-        section_name = meta["section"]
-        catalog_type = meta["type"]
-        
-        # For generic addons, limit to 30 items and filter
-        if meta["source"] == "generic":
-            metas = metas[:30]
-            metas = [m for m in metas if m.get('name') and m.get('id')]
-        
-        if not metas:
+    # Process results in plan order; unfinished fetches keep running and fill the catalog cache
+    pending = []
+    sections = {}
+    for entry, task in zip(plan, tasks):
+        if not task.done():
+            pending.append({"id": entry["id"], "section": entry["section"], "type": entry["type"]})
             continue
-        
-        if section_name not in result['services']:
-            result['services'][section_name] = {'movies': [], 'series': [], 'channels': []}
-            if meta["source"] == "generic":
-                result['services'][section_name]['_catalog_id'] = meta.get('catalog_id', '')
-                result['services'][section_name]['_base_url'] = meta.get('base_url', '')
-        
-        if catalog_type == 'movie':
-            result['services'][section_name]['movies'].extend(metas)
-        elif catalog_type == 'series':
-            result['services'][section_name]['series'].extend(metas)
-        elif catalog_type == 'tv':
-            result['services'][section_name]['channels'].extend(metas)
-        
-        logger.info(f"{meta['source']}: {len(metas)} items for {section_name}")
+        add_discover_section(result, entry, task.result(), sections)
+    logger.info(f"{len(plan) - len(pending)}/{len(plan)} catalog fetches completed in {elapsed:.2f}s")
     
-    # Cache the result
-    _discover_cache[cache_key] = {
+    if pending:
+        return payload_response(request, CachedPayload({**result, "pending": pending, "sections": sections}))
+    
+    # Cache the result (the progressive form is built on first use)
+    payload = CachedPayload(result)
+    cache_entry = _discover_cache[cache_key] = {
         "data": result,
+        "sections": sections,
+        "payload": payload,
         "expires": datetime.utcnow() + timedelta(seconds=DISCOVER_CACHE_TTL)
     }
+    if progressive:
+        cache_entry["progressive_payload"] = CachedPayload({**result, "sections": sections})
+        return payload_response(request, cache_entry["progressive_payload"])
+    return payload_response(request, payload)
+
+
+@api_router.get("/content/discover/section/{section_id}")
+async def get_discover_section(section_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    """One pending discover section, shaped like an entry of discover's "services"
+    plus its "section" name and "fetchedAt" freshness"""
+    addons = await db.addons.find({"userId": current_user.id}).sort("installedAt", 1).to_list(100)
+    entry = next((e for e in build_discover_plan(addons) if e["id"] == section_id), None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Section not found")
     
-    return result
+    catalog = await fetch_discover_catalog(entry["url"])
+    result = {"services": {}}
+    sections = {}
+    add_discover_section(result, entry, catalog, sections)
+    section = result["services"].get(entry["section"], {'movies': [], 'series': [], 'channels': []})
+    freshness = sections.get(entry["section"], {"ids": [entry["id"]], "fetchedAt": None})
+    return payload_response(request, CachedPayload({"section": entry["section"], **section, "fetchedAt": freshness["fetchedAt"]}))
+
 
 @api_router.get("/content/category/{service_name}/{content_type}")
 async def get_category_content(
     service_name: str,
     content_type: str,  # movies, series, channels
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user)
 ):
     """Fetch full category content from an addon with pagination"""
+    cache_key = f"category:{current_user.id}:{service_name}:{content_type}:{skip}:{limit}"
+    cached = _discover_cache.get(cache_key)
+    if cached and cached["expires"] > datetime.utcnow():
+        return payload_response(request, cached["payload"])
+    
+    result = await fetch_category_content(service_name, content_type, skip, limit, current_user)
+    payload = CachedPayload(result)
+    if result.get("items"):
+        _discover_cache[cache_key] = {
+            "payload": payload,
+            "expires": datetime.utcnow() + timedelta(seconds=DISCOVER_CACHE_TTL)
+        }
+    return payload_response(request, payload)
+
+
+async def fetch_category_content(service_name: str, content_type: str, skip: int, limit: int, current_user: User) -> dict:
+    """Category page from the user's addons (uncached)"""
     # Get user's addons
     addons = await db.addons.find({"userId": current_user.id}).to_list(100)
     
@@ -2865,6 +3613,8 @@ async def get_category_content(
                             except Exception:
                                 pass
                         
+                        search_index.add_many(metas, catalog_type)
+                        
                         total_available = len(metas)
                         page_items = metas[:limit]
                         
@@ -2916,6 +3666,7 @@ async def get_category_content(
                     if response.status_code == 200:
                         metas = response.json().get('metas', [])
                         metas = [m for m in metas if m.get('name') and m.get('id')]
+                        search_index.add_many(metas, catalog_type)
                         items.extend(metas)
             except Exception as e:
                 logger.warning(f"Error fetching category {catalog_id}: {e}")
@@ -2934,14 +3685,51 @@ async def search_content(
     skip: int = 0,
     limit: int = 30,
     content_type: str = None,  # 'movie' or 'series' to filter
+    genre: str = None,  # title searches: only this genre
+    year: int = None,  # title searches: only this release year
+    session: str = None,  # search-as-you-type session ID
     current_user: User = Depends(get_current_user)
 ):
-    """Search content via Cinemeta - supports title search and cast/director/genre searches with pagination"""
+    """Search content - title searches answer from the local index and merge Cinemeta,
+    cast/director/genre searches go to Cinemeta; with pagination.
+    
+    Requests carrying a session ID cancel that session's in-flight search (its
+    upstream requests and verification tasks) and get back {"superseded": true}."""
     if not q or len(q) < 2:
         return {"movies": [], "series": [], "hasMore": False, "total": 0}
-    
-    # Common words to ignore when matching
-    STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'of', 'in', 'on', 'at', 'to', 'for', 'is', 'it'}
+    if not session:
+        return await run_search(q, skip, limit, content_type, genre, year)
+    
+    _prune_search_sessions()
+    key = f"{current_user.id}:{session}"
+    state = _search_sessions.setdefault(key, {"task": None, "results": None})
+    previous = state["task"]
+    if previous is not None and not previous.done():
+        previous.cancel()
+    task = asyncio.create_task(run_search(q, skip, limit, content_type, genre, year, state))
+    state["task"] = task
+    state["touched"] = time.time()
+    try:
+        # A client disconnect cancels this handler, and with it the task
+        return await task
+    except asyncio.CancelledError:
+        if task.cancelled() and state["task"] is not task:
+            logger.info(f"Search '{q}' superseded in session {session}")
+            return {"movies": [], "series": [], "superseded": True}
+        raise
+
+
+async def run_search(
+    q: str,
+    skip: int = 0,
+    limit: int = 30,
+    content_type: str = None,
+    genre: str = None,
+    year: int = None,
+    session_state: Optional[dict] = None
+):
+    """The search itself; session_state carries the previous completed title
+    search so a longer query can narrow its results locally"""
     
     # Detect if this looks like a person name search (cast/director)
     # Person names usually: 2-3 words, each capitalized, no common movie words
@@ -2992,50 +3780,29 @@ async def search_content(
     
     logger.info(f"Search query: '{q}' - skip={skip}, limit={limit}, type={content_type}, is_genre={is_genre_search}")
     
-    # If it's a genre search, fetch from genre catalog with pagination
+    # If it's a genre search, serve pages from the shared genre catalog cache
     if is_genre_search and genre_name:
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=20.0) as client:
-                # Fetch genre-specific catalogs from Cinemeta with skip parameter
-                # Format: /catalog/{type}/top/genre={genre}/skip={skip}.json
-                if skip > 0:
-                    movie_url = f"https://v3-cinemeta.strem.io/catalog/movie/top/genre={genre_name}/skip={skip}.json"
-                    series_url = f"https://v3-cinemeta.strem.io/catalog/series/top/genre={genre_name}/skip={skip}.json"
-                else:
-                    movie_url = f"https://v3-cinemeta.strem.io/catalog/movie/top/genre={genre_name}.json"
-                    series_url = f"https://v3-cinemeta.strem.io/catalog/series/top/genre={genre_name}.json"
-                
-                logger.info(f"Fetching genre catalog: {movie_url}")
-                
-                # Fetch based on content_type filter
-                movies = []
-                series = []
-                
-                if content_type != 'series':
-                    movie_resp = await client.get(movie_url)
-                    if movie_resp.status_code == 200:
-                        movies = movie_resp.json().get('metas', [])
-                        logger.info(f"Genre '{genre_name}' movies: {len(movies)}")
-                
-                if content_type != 'movie':
-                    series_resp = await client.get(series_url)
-                    if series_resp.status_code == 200:
-                        series = series_resp.json().get('metas', [])
-                        logger.info(f"Genre '{genre_name}' series: {len(series)}")
-                
-                # Apply limit
-                movies = movies[:limit]
-                series = series[:limit]
-                
-                # Determine if there's more content
-                has_more = len(movies) >= limit or len(series) >= limit
-                
-                return {
-                    "movies": movies,
-                    "series": series,
-                    "hasMore": has_more,
-                    "total": len(movies) + len(series)
-                }
+            # Fetch based on content_type filter; movies and series concurrently
+            types = [t for t in ('movie', 'series') if content_type == t or content_type not in ('movie', 'series')]
+            pages = await asyncio.gather(*(get_genre_page(t, genre_name, skip, skip + limit) for t in types))
+            by_type = dict(zip(types, pages))
+            movies, series = by_type.get('movie', []), by_type.get('series', [])
+            logger.info(f"Genre '{genre_name}': {len(movies)} movies, {len(series)} series")
+            
+            # Apply limit
+            movies = movies[:limit]
+            series = series[:limit]
+            
+            # Determine if there's more content
+            has_more = len(movies) >= limit or len(series) >= limit
+            
+            return {
+                "movies": movies,
+                "series": series,
+                "hasMore": has_more,
+                "total": len(movies) + len(series)
+            }
         except Exception as e:
             logger.error(f"Genre search error: {str(e)}")
             # Fall back to regular search
@@ -3047,7 +3814,7 @@ async def search_content(
         query_words_lower = query_lower.split()
         
         # Get significant words (non-stop words) from query
-        significant_words = [w for w in query_words_lower if w not in STOP_WORDS and len(w) > 1]
+        significant_words = [w for w in query_words_lower if w not in SEARCH_STOP_WORDS and len(w) > 1]
         
         # If no significant words, use all words
         if not significant_words:
@@ -3088,99 +3855,6 @@ async def search_content(
         # If not matching and not trusting Cinemeta, reject
         return 0
     
-    async def check_has_streams(content_type: str, content_id: str) -> bool:
-        """Quick check if content has any streams available"""
-        try:
-            # Try multiple sources for stream availability
-            async with httpx.AsyncClient(follow_redirects=True, timeout=6.0) as client:
-                # Try ApiBay (The Pirate Bay) - fast and usually available
-                if content_type == 'movie':
-                    # For movies, we'll assume popular titles have streams
-                    # Check via a quick ApiBay search using the IMDB ID
-                    try:
-                        url = f"https://apibay.org/q.php?q={content_id}"
-                        response = await client.get(url, timeout=4.0)
-                        if response.status_code == 200:
-                            results = response.json()
-                            if isinstance(results, list) and len(results) > 0:
-                                # Check if we got real results (not "No results")
-                                if results[0].get('id') != '0':
-                                    return True
-                    except:
-                        pass
-                
-                # Try 1337x addon as backup
-                try:
-                    url = f"https://1337x-api.strem.fun/stream/{content_type}/{content_id}.json"
-                    response = await client.get(url, timeout=4.0)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get('streams') and len(data.get('streams', [])) > 0:
-                            return True
-                except:
-                    pass
-                
-                # For series, assume most popular series have streams
-                if content_type == 'series':
-                    return True  # Most series in Cinemeta have streams available
-                    
-        except:
-            pass
-        return False
-    
-    async def verify_actor_in_cast(client: httpx.AsyncClient, content_type: str, content_id: str, actor_name: str):
-        """Verify that an actor appears in the cast of a specific content item"""
-        try:
-            url = f"https://v3-cinemeta.strem.io/meta/{content_type}/{content_id}.json"
-            response = await client.get(url, timeout=8.0)
-            if response.status_code == 200:
-                data = response.json()
-                meta = data.get('meta', {})
-                cast = meta.get('cast', [])
-                
-                # Normalize actor name for comparison
-                actor_lower = actor_name.lower().strip()
-                actor_parts = actor_lower.split()
-                
-                # For person searches, require at least first and last name
-                if len(actor_parts) < 2:
-                    return False
-                
-                # Check each cast member
-                for cast_member in cast:
-                    if isinstance(cast_member, str):
-                        cast_lower = cast_member.lower().strip()
-                    elif isinstance(cast_member, dict):
-                        cast_lower = cast_member.get('name', '').lower().strip()
-                    else:
-                        continue
-                    
-                    cast_parts = cast_lower.split()
-                    
-                    # Require exact match on full name
-                    if actor_lower == cast_lower:
-                        return True
-                    
-                    # Or match if first name AND last name both appear in cast member name
-                    # This handles "David Harbour" matching "David K. Harbour" or similar
-                    first_name = actor_parts[0]
-                    last_name = actor_parts[-1]
-                    
-                    # Both first and last name must be in the cast member's name
-                    # And the cast member name must be similar length (to avoid "David" matching "David Holmes")
-                    first_match = first_name in cast_parts or any(p.startswith(first_name) for p in cast_parts)
-                    last_match = last_name in cast_parts or any(p.startswith(last_name) for p in cast_parts)
-                    
-                    if first_match and last_match:
-                        # Additional check: cast name shouldn't be much longer than search name
-                        if len(cast_parts) <= len(actor_parts) + 1:
-                            return True
-                        
-                return False
-        except Exception as e:
-            logger.debug(f"Error verifying actor for {content_id}: {e}")
-            return False
-    
     # Handle actor/person searches with verification
     if is_likely_person_name:
         logger.info(f"Actor search detected for: '{q}'")
@@ -3205,38 +3879,32 @@ async def search_content(
                 if not isinstance(series_resp, Exception) and series_resp.status_code == 200:
                     series_raw = series_resp.json().get('metas', [])[:30]
                 
-                logger.info(f"Actor search '{q}': Found {len(movies_raw)} movies, {len(series_raw)} series to verify")
+                search_index.add_many(movies_raw, 'movie')
+                search_index.add_many(series_raw, 'series')
                 
-                # Verify actor is in cast for each result
-                async def verify_and_return_movie(m):
-                    content_id = m.get('imdb_id') or m.get('id')
-                    if content_id and await verify_actor_in_cast(client, 'movie', content_id, q):
-                        # Skip stream check for actor search - too slow and unreliable
-                        return m
-                    return None
+                logger.info(f"Actor search '{q}': Found {len(movies_raw)} movies, {len(series_raw)} series to verify")
                 
-                async def verify_and_return_series(s):
-                    content_id = s.get('imdb_id') or s.get('id')
-                    if content_id and await verify_actor_in_cast(client, 'series', content_id, q):
-                        return s
-                    return None
+                # Verify actor is in cast for each result - a cast index lookup;
+                # only metas the index has never seen are fetched
+                candidates = [('movie', m.get('imdb_id') or m.get('id')) for m in movies_raw] + \
+                             [('series', s.get('imdb_id') or s.get('id')) for s in series_raw]
+                casts = await load_cast([(ctype, cid) for ctype, cid in candidates if cid])
                 
-                # Run verifications in parallel
-                movie_checks = await asyncio.gather(*[verify_and_return_movie(m) for m in movies_raw])
-                series_checks = await asyncio.gather(*[verify_and_return_series(s) for s in series_raw])
+                def verified(items):
+                    return [i for i in items if cast_matches(q, casts.get(i.get('imdb_id') or i.get('id'), []))]
                 
-                verified_movies = [m for m in movie_checks if m is not None]
-                verified_series = [s for s in series_checks if s is not None]
+                verified_movies = verified(movies_raw)
+                verified_series = verified(series_raw)
                 
                 logger.info(f"Actor search '{q}': Verified {len(verified_movies)} movies, {len(verified_series)} series")
                 
                 # Apply pagination
                 total_count = len(verified_movies) + len(verified_series)
-                has_more = False  # Actor search doesn't support pagination currently
+                has_more = len(verified_movies) > skip + limit or len(verified_series) > skip + limit
                 
                 return {
-                    "movies": verified_movies[:limit],
-                    "series": verified_series[:limit],
+                    "movies": verified_movies[skip:skip + limit],
+                    "series": verified_series[skip:skip + limit],
                     "hasMore": has_more,
                     "total": total_count
                 }
@@ -3245,77 +3913,107 @@ async def search_content(
             # Fall through to regular search
     
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
-            # URL encode the query properly
-            encoded_q = q.replace(' ', '%20')
-            movie_url = f"https://v3-cinemeta.strem.io/catalog/movie/top/search={encoded_q}.json"
-            series_url = f"https://v3-cinemeta.strem.io/catalog/series/top/search={encoded_q}.json"
-            
-            movie_resp, series_resp = await asyncio.gather(
-                client.get(movie_url),
-                client.get(series_url),
-                return_exceptions=True
-            )
-            
-            movies = []
-            series = []
-            
-            if not isinstance(movie_resp, Exception) and movie_resp.status_code == 200:
-                movies = movie_resp.json().get('metas', [])
-            
-            if not isinstance(series_resp, Exception) and series_resp.status_code == 200:
-                series = series_resp.json().get('metas', [])
-            
-            # Score and sort results by relevance
-            movies_scored = [(m, score_result(m, q, trust_cinemeta=False)) for m in movies]
-            series_scored = [(s, score_result(s, q, trust_cinemeta=False)) for s in series]
-            
-            # Only include results with score > 0
-            result_limit = 15
-            movies_filtered = [m for m, score in sorted(movies_scored, key=lambda x: -x[1]) if score > 0][:result_limit]
-            series_filtered = [s for s, score in sorted(series_scored, key=lambda x: -x[1]) if score > 0][:result_limit]
-            
-            logger.info(f"Search '{q}': checking streams for {len(movies_filtered)} movies, {len(series_filtered)} series")
-            
-            # Check stream availability in parallel (limit to top results for speed)
-            async def check_movie(m):
-                content_id = m.get('imdb_id') or m.get('id')
-                if content_id and await check_has_streams('movie', content_id):
-                    return m
-                return None
-            
-            async def check_series(s):
-                content_id = s.get('imdb_id') or s.get('id')
-                # For series, check first episode of first season
-                if content_id and await check_has_streams('series', f"{content_id}:1:1"):
-                    return s
-                return None
-            
-            # Run stream checks in parallel
-            movie_checks = await asyncio.gather(*[check_movie(m) for m in movies_filtered])
-            series_checks = await asyncio.gather(*[check_series(s) for s in series_filtered])
-            
-            movies_with_streams = [m for m in movie_checks if m is not None]
-            series_with_streams = [s for s in series_checks if s is not None]
-            
-            logger.info(f"Search '{q}': {len(movies_with_streams)} movies, {len(series_with_streams)} series with streams")
-            
-            return {"movies": movies_with_streams, "series": series_with_streams}
+        # Local index first: short queries (search-as-you-type) and queries with
+        # enough strong local hits return without waiting on Cinemeta, which is
+        # still queried in the background so the index keeps filling up.
+        local_hits = search_index.search(q, content_type=content_type, genre=genre, year=year, limit=60)
+        strong_hits = sum(1 for _, score in local_hits if score >= 80)
+        local_only = bool(local_hits) and (
+            len(query_lower) < SEARCH_LOCAL_ONLY_CHARS or strong_hits >= SEARCH_LOCAL_SUFFICIENT
+        )
+        
+        scored: Dict[str, tuple] = {}  # {content_id: (meta, score)}
+        for meta, score in local_hits:
+            scored[meta.get('imdb_id') or meta.get('id')] = (meta, score)
+        
+        # A longer query in the same session narrows the previous result set.
+        # That only replaces the upstream search when the previous one was
+        # complete: Cinemeta answered with less than a full page, so every
+        # match for the longer query was already in it.
+        filters = (content_type, genre, year)
+        previous = (session_state or {}).get("results")
+        narrowed = []
+        if previous and previous["filters"] == filters and query_lower.startswith(previous["query"]):
+            narrowed = [(m, score_result(m, q, trust_cinemeta=False)) for m in previous["items"]]
+            narrowed = [(m, score) for m, score in narrowed if score > 0]
+        for meta, score in narrowed:
+            item_id = meta.get('imdb_id') or meta.get('id')
+            if score > scored.get(item_id, (None, 0))[1]:
+                scored[item_id] = (meta, score)
+        complete = bool(narrowed) and previous["complete"]
+        
+        if complete:
+            logger.info(f"Search '{q}': narrowed {len(narrowed)} results from '{previous['query']}'")
+        elif local_only:
+            spawn_background(fetch_cinemeta_search(q))
+            logger.info(f"Search '{q}': {len(local_hits)} local hits, Cinemeta refresh in background")
+        else:
+            movies, series = await fetch_cinemeta_search(q)
+            complete = all(items is not None and len(items) < CINEMETA_SEARCH_PAGE_SIZE for items in (movies, series))
+            for ctype, items in (('movie', movies or []), ('series', series or [])):
+                if content_type and content_type != ctype:
+                    continue
+                for item in items:
+                    item_id = item.get('imdb_id') or item.get('id')
+                    if not item_id or not meta_matches_filters(item, genre, year):
+                        continue
+                    score = score_result(item, q, trust_cinemeta=False)
+                    if score > scored.get(item_id, (None, 0))[1]:
+                        scored[item_id] = (dict(item, type=item.get('type') or ctype), score)
+        
+        if session_state is not None:
+            session_state["results"] = {
+                "query": query_lower,
+                "filters": filters,
+                "items": [meta for meta, _ in scored.values()],
+                "complete": complete,
+            }
+        
+        # Only include results with score > 0
+        result_limit = 15
+        ranked = sorted((entry for entry in scored.values() if entry[1] > 0), key=lambda x: -x[1])
+        movies_filtered = [m for m, _ in ranked if m.get('type') == 'movie'][:result_limit]
+        series_filtered = [s for s, _ in ranked if s.get('type') == 'series'][:result_limit]
+        
+        logger.info(f"Search '{q}': checking availability for {len(movies_filtered)} movies, {len(series_filtered)} series")
+        
+        # Filter on the stream availability index (no third-party probes in the request)
+        movies_with_streams, series_with_streams = await asyncio.gather(
+            filter_by_availability('movie', movies_filtered),
+            filter_by_availability('series', series_filtered),
+        )
+        
+        logger.info(f"Search '{q}': {len(movies_with_streams)} movies, {len(series_with_streams)} series with streams")
+        
+        return {"movies": movies_with_streams, "series": series_with_streams}
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         return {"movies": [], "series": []}
 
 @api_router.get("/content/meta/{content_type}/{content_id}")
-async def get_meta(content_type: str, content_id: str, current_user: User = Depends(get_current_user)):
+async def get_meta(
+    content_type: str,
+    content_id: str,
+    request: Request,
+    fields: str = None,  # comma-separated top-level fields to return (e.g. "name,poster,videos")
+    season: int = None,  # series: only this season's episodes (adds "seasons")
+    current_user: User = Depends(get_current_user)
+):
     """Get metadata for content including episodes for series"""
+    wanted = {f.strip() for f in fields.split(',') if f.strip()} if fields else None
     
     # Check meta cache (10 minute TTL)
     meta_cache_key = f"meta:{content_type}:{content_id}"
     cached_meta = _discover_cache.get(meta_cache_key)
+    projection = (fields or '', season)
     if cached_meta and cached_meta["expires"] > datetime.utcnow():
         logger.info(f"Meta cache HIT for {content_type}/{content_id}")
-        return cached_meta["data"]
+        payloads = cached_meta["payloads"]
+        if projection not in payloads:
+            payloads[projection] = CachedPayload(cached_meta["data"].project(wanted, season))
+        return payload_response(request, payloads[projection])
     
+    compact = None
     try:
         client = await get_shared_http_client()
         
@@ -3329,68 +4027,111 @@ async def get_meta(content_type: str, content_id: str, current_user: User = Depe
                     meta = data.get('meta', {})
                     if meta:
                         logger.info(f"Got TV channel meta for {meta.get('name', content_id)}")
-                        _discover_cache[meta_cache_key] = {"data": meta, "expires": datetime.utcnow() + timedelta(seconds=600)}
-                        return meta
+                        compact = CompactMeta(meta, content_type)
             except Exception as e:
                 logger.warning(f"USA TV meta error: {e}")
         
         # For movies/series, use Cinemeta
-        url = f"https://v3-cinemeta.strem.io/meta/{content_type}/{content_id}.json"
-        response = await client.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            meta = data.get('meta', {})
-            
-            # For series, ensure videos (episodes) are included and properly formatted
-            if content_type == 'series' and 'videos' in meta:
-                episodes = []
-                for video in meta.get('videos', []):
-                    episodes.append({
-                        'id': video.get('id', ''),
-                        'season': video.get('season', 0),
-                        'episode': video.get('episode', 0),
-                        'name': video.get('name') or video.get('title', f"Episode {video.get('episode', 0)}"),
-                        'thumbnail': video.get('thumbnail'),
-                        'overview': video.get('overview'),
-                        'released': video.get('released'),
-                    })
-                meta['videos'] = episodes
-                logger.info(f"Returning {len(episodes)} episodes for {meta.get('name', 'Unknown')}")
-            
-            # Cache the result
-            _discover_cache[meta_cache_key] = {"data": meta, "expires": datetime.utcnow() + timedelta(seconds=600)}
-            return meta
+        if compact is None:
+            url = f"https://v3-cinemeta.strem.io/meta/{content_type}/{content_id}.json"
+            response = await client.get(url)
+            if response.status_code == 200:
+                data = response.json()
+                meta = data.get('meta', {})
+                
+                record_cast(content_type, meta, content_id)
+                search_index.add(meta, content_type)
+                
+                # For series, episodes are bucketed by season and formatted on the way out
+                compact = CompactMeta(meta, content_type)
+                if compact.seasons is not None:
+                    episode_count = sum(len(rows) for rows in compact.seasons.values())
+                    logger.info(f"Cached {episode_count} episodes for {meta.get('name', 'Unknown')}")
     except Exception as e:
         logger.error(f"Error fetching meta: {str(e)}")
     
-    raise HTTPException(status_code=404, detail="Meta not found")
+    if compact is None:
+        raise HTTPException(status_code=404, detail="Meta not found")
+    
+    # Cache the result; serialized payloads are kept per projection
+    payload = CachedPayload(compact.project(wanted, season))
+    _discover_cache[meta_cache_key] = {
+        "data": compact,
+        "payloads": {projection: payload},
+        "expires": datetime.utcnow() + timedelta(seconds=META_CACHE_TTL)
+    }
+    return payload_response(request, payload)
 
 
 # ==================== LIBRARY ROUTES ====================
 
+LIBRARY_GROUPS = (("movies", "movie"), ("series", "series"), ("channels", "tv"))
+LIBRARY_MAX_ITEMS = 1000  # per group: unpaginated requests and the largest page
+
+
+async def _library_page(user_id: str, item_type: str, limit: Optional[int], cursor: Optional[str]) -> tuple:
+    """(items, next_cursor) for one type, in insertion (_id) order"""
+    query = {"user_id": user_id, "type": item_type}
+    if cursor:
+        try:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    find = db.library.find(query).sort("_id", 1)
+    find = find.limit(limit + 1) if limit else find.limit(LIBRARY_MAX_ITEMS)
+    items = await find.to_list(None)
+    next_cursor = None
+    if limit and len(items) > limit:
+        items = items[:limit]
+        next_cursor = str(items[-1]["_id"])
+    for item in items:
+        del item["_id"]
+    return items, next_cursor
+
+
 @api_router.get("/library")
-async def get_library(current_user: User = Depends(get_current_user)):
-    library_items = await db.library.find({"user_id": current_user.id}).to_list(1000)
-    movies = [item for item in library_items if item.get("type") == "movie"]
-    series = [item for item in library_items if item.get("type") == "series"]
-    channels = [item for item in library_items if item.get("type") == "tv"]
-    for item in movies + series + channels:
-        item.pop('_id', None)
-    return {"movies": movies, "series": series, "channels": channels}
+async def get_library(
+    item_type: Optional[str] = Query(None, alias="type"),  # movies, series or channels - only that group
+    limit: Optional[int] = Query(None, ge=1, le=LIBRARY_MAX_ITEMS),  # page size per group (default: up to LIBRARY_MAX_ITEMS)
+    cursor: str = None,  # "cursors" value from the previous page (needs type)
+    current_user: User = Depends(get_current_user)
+):
+    """Library grouped by type; each group is an indexed query and, with limit,
+    paginated by cursor"""
+    groups = [(name, group_type) for name, group_type in LIBRARY_GROUPS if item_type in (None, name)]
+    if not groups:
+        raise HTTPException(status_code=400, detail="Unknown library type")
+    if cursor and len(groups) > 1:
+        raise HTTPException(status_code=400, detail="cursor requires type")
+    pages = await asyncio.gather(*(
+        _library_page(current_user.id, group_type, limit, cursor) for _, group_type in groups
+    ))
+    result = {name: items for (name, _), (items, _) in zip(groups, pages)}
+    if limit:
+        result["cursors"] = {name: next_cursor for (name, _), (_, next_cursor) in zip(groups, pages)}
+    return result
 
 @api_router.post("/library")
 async def add_to_library(item: LibraryItem, current_user: User = Depends(get_current_user)):
     item_dict = item.dict()
     item_dict["user_id"] = current_user.id
     
-    existing = await db.library.find_one({
-        "user_id": current_user.id,
-        "$or": [{"id": item.id}, {"imdb_id": item.imdb_id}]
-    })
-    if existing:
+    # An item already saved under the same id or imdb_id counts as present;
+    # the unique (user_id, id) index settles concurrent adds
+    match = [{"id": item.id}]
+    if item.imdb_id:
+        match.append({"imdb_id": item.imdb_id})
+    try:
+        result = await db.library.update_one(
+            {"user_id": current_user.id, "$or": match},
+            {"$setOnInsert": item_dict},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent add of the same item won the race
+        return {"message": "Already in library"}
+    if result.upserted_id is None:
         return {"message": "Already in library"}
-    
-    await db.library.insert_one(item_dict)
     return {"message": "Added to library"}
 
 @api_router.delete("/library/{item_type}/{item_id}")
@@ -3405,6 +4146,129 @@ async def remove_from_library(item_type: str, item_id: str, current_user: User =
 
 
 # ==================== WATCH PROGRESS / CONTINUE WATCHING ====================
+# Continue Watching is a view maintained at write time: each progress record
+# carries an in_continue flag and a poster/backdrop/logo snapshot, so the
+# list is one indexed query, and each worker keeps the user's top N in
+# memory (refreshed from Mongo after CONTINUE_WATCHING_TTL so writes landing
+# on other workers show up).
+
+CONTINUE_WATCHING_LIMIT = 50
+CONTINUE_WATCHING_MAX_PERCENT = 95
+CONTINUE_WATCHING_TTL = 15  # seconds
+
+_continue_watching_views: Dict[str, dict] = {}  # {user_id: {"items": [...], "expires": float}}
+
+
+def in_continue_watching(progress_dict: dict) -> bool:
+    # Stremio shows items with ANY progress (time_offset > 0)
+    # We filter out items that are mostly watched (>95%) 
+    # but show everything else regardless of how little was watched
+    return progress_dict.get("progress", 0) > 0 and \
+        (progress_dict.get("percent_watched") or 0) <= CONTINUE_WATCHING_MAX_PERCENT
+
+
+def snapshot_meta(progress_dict: dict):
+    """Fill missing poster/backdrop/logo from metas this worker has seen"""
+    if progress_dict.get("poster") and progress_dict.get("backdrop") and progress_dict.get("logo"):
+        return
+    content_type = progress_dict.get("content_type") or "movie"
+    base_id = progress_dict.get("series_id") or progress_dict["content_id"].split(':')[0]
+    cached = _discover_cache.get(f"meta:{content_type}:{base_id}")
+    meta = cached["data"].base if cached else search_index.docs.get(base_id)
+    if not meta:
+        return
+    for field, meta_field in (("poster", "poster"), ("backdrop", "background"), ("logo", "logo")):
+        if not progress_dict.get(field) and meta.get(meta_field):
+            progress_dict[field] = meta[meta_field]
+
+
+def update_continue_watching_view(user_id: str, content_id: str, doc: Optional[dict] = None):
+    """Apply a write to this worker's in-memory view (doc=None removes the item)"""
+    view = _continue_watching_views.get(user_id)
+    if view is None:
+        return
+    items = [item for item in view["items"] if item.get("content_id") != content_id]
+    if doc is not None and doc.get("in_continue"):
+        items.insert(0, doc)
+    view["items"] = items[:CONTINUE_WATCHING_LIMIT]
+
+
+async def get_continue_watching(user_id: str) -> list:
+    view = _continue_watching_views.get(user_id)
+    if view is not None and view["expires"] > time.time():
+        return view["items"]
+    items = await db.watch_progress.find(
+        {"user_id": user_id, "in_continue": True},
+        {"_id": 0, "deleted_at": 0}
+    ).sort("updated_at", -1).to_list(CONTINUE_WATCHING_LIMIT)
+    _continue_watching_views[user_id] = {"items": items, "expires": time.time() + CONTINUE_WATCHING_TTL}
+    # Heartbeats not flushed yet are newer than what Mongo has
+    for (buffered_user, content_id), doc in list(_progress_buffer.items()):
+        if buffered_user == user_id:
+            update_continue_watching_view(user_id, content_id, doc)
+    return _continue_watching_views[user_id]["items"]
+
+
+# Write-behind buffer for progress heartbeats: saves are coalesced per
+# (user, content) and written with one bulk_write every
+# PROGRESS_FLUSH_INTERVAL, when a record leaves Continue Watching, on
+# ?final=true and at worker shutdown.  Reads in this worker go through the
+# buffer; a crash loses at most one interval of heartbeats.
+#
+# Each worker has its own buffer, so deletes are made authoritative in Mongo:
+# a delete leaves a tombstone (deleted_at), and a flushed heartbeat only
+# replaces the record if it is newer than the tombstone.  Tombstones expire
+# after PROGRESS_TOMBSTONE_TTL.
+
+PROGRESS_FLUSH_INTERVAL = 30  # seconds
+PROGRESS_TOMBSTONE_TTL = 24 * 3600
+_EPOCH = datetime(1970, 1, 1)
+
+_progress_buffer: Dict[tuple, dict] = {}  # {(user_id, content_id): progress_dict}
+
+
+def _progress_upsert(user_id: str, content_id: str, doc: dict) -> UpdateOne:
+    """Upsert a buffered heartbeat unless the record was deleted after it was taken"""
+    newer_delete = {"$gt": [{"$ifNull": ["$deleted_at", _EPOCH]}, doc["updated_at"]]}
+    return UpdateOne(
+        {"user_id": user_id, "content_id": content_id},
+        [{"$replaceWith": {"$cond": [
+            newer_delete,
+            "$$ROOT",
+            {"$mergeObjects": ["$$ROOT", {"$literal": doc}, {"deleted_at": None}]},
+        ]}}],
+        upsert=True
+    )
+
+
+async def flush_progress_buffer(keys: Optional[list] = None):
+    """Write buffered progress (all of it, or just keys) to Mongo"""
+    if keys is None:
+        keys = list(_progress_buffer)
+    batch = {key: _progress_buffer.pop(key) for key in keys if key in _progress_buffer}
+    if not batch:
+        return
+    try:
+        await db.watch_progress.bulk_write([
+            _progress_upsert(user_id, content_id, doc) for (user_id, content_id), doc in batch.items()
+        ], ordered=False)
+    except Exception as e:
+        logger.warning(f"Progress flush of {len(batch)} records failed: {e}")
+        # Put them back unless a newer heartbeat arrived meanwhile (a delete
+        # since then is still honoured by the upsert)
+        for key, doc in batch.items():
+            _progress_buffer.setdefault(key, doc)
+
+
+async def progress_flusher():
+    """Background loop flushing this worker's progress buffer"""
+    while True:
+        await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+        try:
+            await flush_progress_buffer()
+        except Exception as e:
+            logger.error(f"Progress flusher error: {e}")
+
 
 @api_router.get("/watch-progress")
 async def get_watch_progress(current_user: User = Depends(get_current_user)):
@@ -3415,33 +4279,26 @@ async def get_watch_progress(current_user: User = Depends(get_current_user)):
     - Filters out items that are nearly complete (>95%)
     - Sorted by most recently watched
     """
-    progress_items = await db.watch_progress.find(
-        {"user_id": current_user.id},
-        {"_id": 0}
-    ).sort("updated_at", -1).to_list(50)
-    
-    # Stremio shows items with ANY progress (time_offset > 0)
-    # We filter out items that are mostly watched (>95%) 
-    # but show everything else regardless of how little was watched
-    continue_watching = [
-        item for item in progress_items 
-        if item.get("progress", 0) > 0 and item.get("percent_watched", 0) <= 95
-    ]
-    
-    return {"continueWatching": continue_watching}
+    return {"continueWatching": await get_continue_watching(current_user.id)}
 
 @api_router.get("/watch-progress/{content_id:path}")
 async def get_content_progress(content_id: str, current_user: User = Depends(get_current_user)):
     """Get watch progress for a specific content"""
-    progress = await db.watch_progress.find_one(
-        {"user_id": current_user.id, "content_id": content_id},
-        {"_id": 0}
-    )
+    progress = _progress_buffer.get((current_user.id, content_id))
+    if progress is None:
+        progress = await db.watch_progress.find_one(
+            {"user_id": current_user.id, "content_id": content_id, "deleted_at": None},
+            {"_id": 0, "deleted_at": 0}
+        )
     return {"progress": progress}
 
 @api_router.post("/watch-progress")
-async def save_watch_progress(progress: WatchProgress, current_user: User = Depends(get_current_user)):
-    """Save or update watch progress for content"""
+async def save_watch_progress(
+    progress: WatchProgress,
+    final: bool = False,  # playback ended - write through instead of waiting for the flush (optional)
+    current_user: User = Depends(get_current_user)
+):
+    """Save or update watch progress for content (write-behind, see _progress_buffer)"""
     progress_dict = progress.dict()
     progress_dict["user_id"] = current_user.id
     progress_dict["updated_at"] = datetime.utcnow()
@@ -3451,24 +4308,33 @@ async def save_watch_progress(progress: WatchProgress, current_user: User = Depe
         progress_dict["percent_watched"] = min((progress.progress / progress.duration) * 100, 100)
     else:
         progress_dict["percent_watched"] = 0
-    
-    # Upsert - update if exists, insert if not
-    await db.watch_progress.update_one(
-        {"user_id": current_user.id, "content_id": progress.content_id},
-        {"$set": progress_dict},
-        upsert=True
-    )
+    progress_dict["in_continue"] = in_continue_watching(progress_dict)
+    snapshot_meta(progress_dict)
+    
+    # Coalesce in the buffer; the flush upserts - update if exists, insert if not.
+    # Finishing a title (it leaves Continue Watching) is written through, since
+    # every worker's view has to drop it
+    key = (current_user.id, progress.content_id)
+    _progress_buffer[key] = progress_dict
+    update_continue_watching_view(current_user.id, progress.content_id, progress_dict)
+    if final or not progress_dict["in_continue"]:
+        await flush_progress_buffer([key])
     
     return {"message": "Progress saved", "percent_watched": progress_dict["percent_watched"]}
 
 @api_router.delete("/watch-progress/{content_id:path}")
 async def delete_watch_progress(content_id: str, current_user: User = Depends(get_current_user)):
     """Delete watch progress for content (clear from continue watching)"""
-    result = await db.watch_progress.delete_one({
-        "user_id": current_user.id,
-        "content_id": content_id
-    })
-    if result.deleted_count == 0:
+    buffered = _progress_buffer.pop((current_user.id, content_id), None)
+    # A tombstone, not a delete: heartbeats other workers still hold are older
+    # than it and are dropped by their flush instead of recreating the record
+    previous = await db.watch_progress.find_one_and_update(
+        {"user_id": current_user.id, "content_id": content_id},
+        {"$set": {"deleted_at": datetime.utcnow(), "in_continue": False}},
+        upsert=True
+    )
+    update_continue_watching_view(current_user.id, content_id)
+    if (previous is None or previous.get("deleted_at")) and buffered is None:
         raise HTTPException(status_code=404, detail="Progress not found")
     return {"message": "Progress deleted"}
 
@@ -3486,8 +4352,10 @@ async def start_stream(
     request: Request,
     fileIdx: Optional[int] = None,
     filename: Optional[str] = None,
+    wait_metadata: float = 0,
 ):
-    """Start downloading a torrent via BOTH libtorrent and WebTorrent for maximum peer connectivity"""
+    """Start downloading a torrent via BOTH libtorrent and WebTorrent for maximum peer connectivity.
+    wait_metadata > 0 holds the response until libtorrent has the metadata (or the timeout passes)."""
     try:
         # Parse request body for trackers (from Torrentio stream sources)
         extra_trackers = []
@@ -3530,6 +4398,9 @@ async def start_stream(
         except Exception as e:
             logger.warning(f"torrent-stream start failed (non-critical): {e}")
         
+        if wait_metadata:
+            has_metadata = await torrent_streamer.wait_for_metadata(info_hash, min(wait_metadata, 30.0))
+            return {"status": "started", "info_hash": info_hash, "has_metadata": has_metadata}
         return {"status": "started", "info_hash": info_hash}
     except Exception as e:
         logger.error(f"Error starting stream: {e}")
@@ -3589,97 +4460,169 @@ async def prewarm_stream(info_hash: str, request: Request):
         logger.warning(f"Prewarm failed for {info_hash}: {e}")
         return {"status": "prewarm_failed", "error": str(e)}
 
-@api_router.get("/stream/status/{info_hash}")
-async def stream_status(info_hash: str):
-    """Get the status of a torrent download - checks BOTH libtorrent AND WebTorrent,
-    returns the BEST status (whichever engine has more peers/progress)"""
+async def collect_stream_status(info_hash: str) -> dict:
+    """Status of a torrent download, read from libtorrent only.
+    In host mode get_status reads the engine's status board, so this is a
+    cheap local read with no side effects; adding a missing torrent is left
+    to ensure_stream_session."""
     try:
-        # Check libtorrent status
         lt_data = torrent_streamer.get_status(info_hash)
         lt_status = lt_data.get("status", "not_found")
         lt_peers = lt_data.get("peers", 0)
         lt_dl_rate = lt_data.get("download_rate", 0)
-        lt_downloaded = lt_data.get("downloaded", 0)
-        
-        if lt_status == "not_found":
-            # Auto-restart on libtorrent
-            try:
-                torrent_streamer.get_session(info_hash)
-            except Exception:
-                pass
+        if lt_status in ("queued", "paused", "rejected"):
+            lt_dl_rate = 0
         
-        # Check torrent-stream status (Stremio-style engine)
-        wt_peers = 0
-        wt_dl_rate = 0
-        wt_ready = False
-        wt_progress = 0
-        wt_name = ""
-        wt_video_size = 0
-        try:
-            async with httpx.AsyncClient(timeout=3.0) as client:
-                wt_resp = await client.get(f"http://localhost:8002/status/{info_hash}")
-                if wt_resp.status_code == 200:
-                    wt_data = wt_resp.json()
-                    wt_peers = wt_data.get("peers", 0)
-                    wt_dl_rate = wt_data.get("downloadSpeed", 0)
-                    wt_ready = wt_data.get("ready", False)
-                    wt_progress = wt_data.get("progress", 0)
-                    wt_name = wt_data.get("videoFile", "") or wt_data.get("name", "")
-                    wt_video_size = wt_data.get("videoSize", 0)
-                    logger.info(f"torrent-stream status for {info_hash}: ready={wt_ready}, peers={wt_peers}, progress={wt_progress:.2%}")
-        except Exception:
-            pass
-        
-        # Use the BEST engine's data
-        total_peers = lt_peers + wt_peers
-        best_dl_rate = max(lt_dl_rate, wt_dl_rate)
-        best_downloaded = max(lt_downloaded, 0)
-        
-        # Determine overall status - if EITHER engine is ready, we're ready
-        if wt_ready:
-            overall_status = "ready"
-        elif lt_status == "ready":
-            overall_status = "ready"
-        elif lt_status == "downloading_metadata" and not wt_ready:
-            overall_status = "downloading_metadata"
+        if lt_status in ("ready", "downloading_metadata", "queued", "rejected"):
+            overall_status = lt_status
         else:
             overall_status = "buffering"
         
-        # Calculate ready_progress
-        ready_progress = lt_data.get("ready_progress", 0)
-        if wt_ready:
-            ready_progress = 100
-        elif wt_progress > 0:
-            ready_progress = max(ready_progress, wt_progress)
-        
+        video_file = lt_data.get("video_file", "") or ""
         return {
             "status": overall_status,
-            "progress": max(lt_data.get("progress", 0), wt_progress),
-            "ready_progress": ready_progress,
-            "peers": total_peers,
-            "download_rate": best_dl_rate,
-            "downloaded": best_downloaded,
-            "name": lt_data.get("video_file", "") or wt_name or "",
-            "video_filename": lt_data.get("video_file", "") or wt_name or "",
-            "video_file": lt_data.get("video_file", "") or wt_name or "",
-            "video_size": max(lt_data.get("video_size", 0), wt_video_size),
-            "first_pieces_ready": lt_data.get("first_pieces_ready", False) or wt_ready,
+            "progress": lt_data.get("progress", 0),
+            "ready_progress": lt_data.get("ready_progress", 0),
+            "peers": lt_peers,
+            "download_rate": lt_dl_rate,
+            "downloaded": max(lt_data.get("downloaded", 0), 0),
+            "name": video_file,
+            "video_filename": video_file,
+            "video_file": video_file,
+            "video_size": lt_data.get("video_size", 0),
+            "first_pieces_ready": lt_data.get("first_pieces_ready", False),
             "last_pieces_ready": lt_data.get("last_pieces_ready", False),
-            "file_ready": lt_data.get("file_ready", False) or wt_ready,
+            "file_ready": lt_data.get("file_ready", False),
             "ready_threshold_mb": lt_data.get("ready_threshold_mb", 2),
-            "engine": "webtorrent" if (wt_ready or wt_peers > lt_peers) else "libtorrent",
+            "engine": "libtorrent",
             "lt_peers": lt_peers,
-            "wt_peers": wt_peers,
+            "lt_status": lt_status,
+            "queue_position": lt_data.get("queue_position"),
+            "reason": lt_data.get("reason"),
         }
     except Exception as e:
         logger.error(f"Error getting stream status: {e}")
         return {"status": "buffering", "progress": 0, "peers": 0, "error": str(e)}
 
+def ensure_stream_session(info_hash: str):
+    """Re-add a torrent libtorrent no longer knows about (the engine proxy
+    sends one add per ENGINE_ADD_RETRY, however often this is called)"""
+    try:
+        if torrent_streamer.get_status(info_hash).get("status", "not_found") == "not_found":
+            torrent_streamer.get_session(info_hash)
+    except Exception:
+        pass
+
+@api_router.get("/stream/status/{info_hash}")
+async def stream_status(info_hash: str):
+    """Get the status of a torrent download (one-shot; /stream/events pushes the same fields)"""
+    ensure_stream_session(info_hash)
+    return await collect_stream_status(info_hash)
+
+# ==================== STREAM STATUS EVENTS ====================
+# Buffering clients subscribe to /stream/events/{info_hash} instead of polling
+# /stream/status.  Every subscriber of one hash (in this worker) shares a
+# single StreamStatusWatcher, which reads the status at most once per
+# STREAM_EVENTS_INTERVAL and publishes it; each subscriber is sent the full
+# status once, then only the fields that changed since its last event.
+# Watchers only read: in host mode that is the engine's shared status board,
+# so a watcher per worker costs one mmap read per interval, not engine work.
+
+STREAM_EVENTS_INTERVAL = 1.0    # seconds between status collections per torrent
+STREAM_EVENTS_KEEPALIVE = 15.0  # comment line after this long without changes
+
+_stream_watchers: Dict[str, "StreamStatusWatcher"] = {}
+
+
+class StreamStatusWatcher:
+    """Reads one torrent's status for all of its event-stream subscribers"""
+
+    def __init__(self, info_hash: str):
+        self.info_hash = info_hash
+        self.subscribers = 0
+        self.status: Optional[dict] = None
+        self.changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self.subscribers > 0:
+                status = await collect_stream_status(self.info_hash)
+                if status != self.status:
+                    self.status = status
+                    self.changed.set()
+                    self.changed = asyncio.Event()
+                await asyncio.sleep(STREAM_EVENTS_INTERVAL)
+        finally:
+            if _stream_watchers.get(self.info_hash) is self:
+                del _stream_watchers[self.info_hash]
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def subscribe_stream_status(info_hash: str) -> StreamStatusWatcher:
+    info_hash = info_hash.lower()
+    watcher = _stream_watchers.get(info_hash)
+    if watcher is None or watcher.task.done():
+        watcher = _stream_watchers[info_hash] = StreamStatusWatcher(info_hash)
+    watcher.subscribers += 1
+    return watcher
+
+
+def unsubscribe_stream_status(watcher: StreamStatusWatcher):
+    # The watcher task exits on its next pass once nobody is subscribed
+    watcher.subscribers -= 1
+
+
+def status_delta(previous: Optional[dict], current: dict) -> dict:
+    """Fields of current that differ from previous (all of them when there is no previous)"""
+    if previous is None:
+        return dict(current)
+    return {k: v for k, v in current.items() if previous.get(k) != v}
+
+
+@api_router.get("/stream/events/{info_hash}")
+async def stream_events(info_hash: str, request: Request):
+    """Server-sent events with the torrent's status: a full 'status' event,
+    then 'delta' events carrying only changed fields, at most once per
+    STREAM_EVENTS_INTERVAL"""
+    ensure_stream_session(info_hash)
+    watcher = subscribe_stream_status(info_hash)
+    
+    async def event_stream():
+        sent = None
+        try:
+            while not await request.is_disconnected():
+                status = watcher.status
+                if status is not None and status is not sent:
+                    delta = status_delta(sent, status)
+                    if delta:
+                        event = "status" if sent is None else "delta"
+                        yield b"event: " + event.encode() + b"\ndata: " + dumps_json(delta) + b"\n\n"
+                    sent = status
+                    continue
+                if not await watcher.wait_for_change(STREAM_EVENTS_KEEPALIVE):
+                    yield b": keepalive\n\n"
+        finally:
+            unsubscribe_stream_status(watcher)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @api_router.post("/stream/seek/{info_hash}")
 async def seek_stream(info_hash: str, request: Request):
-    """Tell the backend to reprioritize pieces for a seek target position.
-    This is called when the user seeks in the video player so we can
-    download the pieces at the new position ASAP."""
+    """Tell the backend about a seek target position.
+    /stream/video already follows the player's read offset (see
+    TorrentStreamer.schedule_deadlines), so this is only a head start: a
+    short-lived reader at the target moves the deadline window there now."""
     try:
         body = await request.json()
         position_bytes = body.get("position_bytes", 0)
@@ -3688,70 +4631,24 @@ async def seek_stream(info_hash: str, request: Request):
         if not session_data:
             return {"status": "error", "message": "Session not found"}
         
-        handle = session_data.get('handle')
-        if not handle or not handle.is_valid() or not handle.has_metadata():
+        if not session_data.get('state', {}).get('has_metadata'):
             return {"status": "error", "message": "Torrent not ready"}
         
-        ti = handle.get_torrent_info()
-        piece_length = ti.piece_length()
-        
-        # Get video file offset
-        video_file_info = session_data.get('video_file', {})
-        file_index = video_file_info.get('index', 0)
-        file_offset = ti.files().file_offset(file_index)
-        
-        # Calculate which pieces correspond to the seek position
-        absolute_offset = file_offset + position_bytes
-        target_piece = absolute_offset // piece_length
+        # Short-lived: the player's own reader replaces it when /stream/video reopens
+        reader_id = torrent_streamer.open_reader(info_hash, position_bytes, ttl=STREAM_SEEK_READER_TTL)
+        if isinstance(torrent_streamer, TorrentEngineProxy):
+            # The engine applies the reader after this returns, so the window
+            # in the current snapshot is still the old one
+            logger.info(f"Seek request for {info_hash}: position={position_bytes}, reader={reader_id} queued")
+            return {"status": "queued", "message": f"Deadline window moving to byte {position_bytes}"}
+        scheduled = len(session_data.get('deadline_pieces', ()))
         
-        # Prioritize a large window around the seek target (20MB = ~20 pieces at 1MB/piece)
-        buffer_pieces = max(40, 20 * 1024 * 1024 // piece_length)
-        
-        # Reset all priorities to normal first
-        num_pieces = ti.num_pieces()
-        priorities = [1] * num_pieces
-        
-        # Keep header pieces (first 5MB) at high priority
-        header_pieces = max(10, 5 * 1024 * 1024 // piece_length)
-        for p in range(min(header_pieces, num_pieces)):
-            piece_abs = (file_offset // piece_length) + p
-            if piece_abs < num_pieces:
-                priorities[piece_abs] = 7
-        
-        # Keep tail pieces (last 2MB) at high priority  
-        tail_pieces = max(5, 2 * 1024 * 1024 // piece_length)
-        video_size = video_file_info.get('size', 0)
-        if video_size > 0:
-            tail_start_abs = (file_offset + video_size - tail_pieces * piece_length) // piece_length
-            for p in range(tail_start_abs, min(tail_start_abs + tail_pieces, num_pieces)):
-                if 0 <= p < num_pieces:
-                    priorities[p] = 7
-        
-        # Set HIGH priority for seek target + buffer
-        seek_start = max(0, target_piece - 2)  # A few pieces before for safety
-        seek_end = min(num_pieces, target_piece + buffer_pieces)
-        for p in range(seek_start, seek_end):
-            priorities[p] = 7
-        
-        handle.prioritize_pieces(priorities)
-        
-        # Also use set_piece_deadline for the most urgent pieces (tight deadline)
-        try:
-            for i, p in enumerate(range(target_piece, min(target_piece + 10, num_pieces))):
-                handle.set_piece_deadline(p, i * 100)  # 100ms increments = "download these NOW"
-        except Exception as e:
-            logger.warning(f"set_piece_deadline not supported: {e}")
-        
-        # Force reannounce to find more peers for faster download
-        handle.force_reannounce(0)
-        
-        logger.info(f"Seek request for {info_hash}: position={position_bytes}, piece={target_piece}, buffer={buffer_pieces} pieces")
+        logger.info(f"Seek request for {info_hash}: position={position_bytes}, reader={reader_id}, window={scheduled} pieces")
         
         return {
             "status": "ok",
-            "target_piece": target_piece,
-            "buffer_pieces": buffer_pieces,
-            "message": f"Reprioritized {buffer_pieces} pieces from piece {target_piece}"
+            "buffer_pieces": scheduled,
+            "message": f"Deadline window moved to byte {position_bytes}"
         }
     except Exception as e:
         logger.error(f"Seek error: {e}")
@@ -3794,6 +4691,21 @@ async def prefetch_stream(info_hash: str, request: Request):
         logger.error(f"Prefetch error: {e}")
         return {"status": "error", "message": str(e)}
 
+def _range_start(range_header: Optional[str], video_file: Optional[dict] = None) -> Optional[int]:
+    """First byte a Range header asks for (0 without one); None if unknown"""
+    if not range_header:
+        return 0
+    try:
+        range_spec = range_header.replace("bytes=", "").strip().split(",")[0]
+        if range_spec.startswith("-"):
+            # Last N bytes - needs the file size
+            if not video_file:
+                return None
+            return max(0, video_file['size'] - int(range_spec[1:]))
+        return int(range_spec.split("-")[0])
+    except (ValueError, IndexError):
+        return None
+
 @api_router.get("/stream/video/{info_hash}")
 @api_router.head("/stream/video/{info_hash}")
 async def stream_video(
@@ -3808,6 +4720,7 @@ async def stream_video(
     """
     info_hash = info_hash.lower()
     range_header = request.headers.get("range")
+    read_offset = _range_start(range_header, torrent_streamer.sessions.get(info_hash, {}).get('video_file'))
     
     # === TRY TORRENT-STREAM SERVER FIRST ===
     try:
@@ -3863,12 +4776,18 @@ async def stream_video(
                     response_headers[key] = val
             
             async def streaming_proxy():
+                # libtorrent fetches the same torrent alongside; keep its deadlines on this reader
+                reader_id = torrent_streamer.open_reader(info_hash, read_offset) if read_offset is not None else None
+                offset = read_offset or 0
                 try:
                     async for chunk in resp.aiter_bytes(chunk_size=256 * 1024):
+                        offset += len(chunk)
+                        torrent_streamer.advance_reader(info_hash, reader_id, offset)
                         yield chunk
                 except Exception as e:
                     logger.error(f"Stream proxy error for {info_hash[:8]}: {e}")
                 finally:
+                    torrent_streamer.close_reader(info_hash, reader_id)
                     await resp.aclose()
                     await client.aclose()
             
@@ -3900,8 +4819,11 @@ async def stream_video(
     video_path = status.get("video_path")
     
     if not video_path or not os.path.isfile(video_path):
-        # Try to find the file in the download directory
-        save_path = torrent_streamer.sessions.get(info_hash, {}).get('save_path', torrent_streamer.download_dir)
+        # Try to find the file in this torrent's own cache entry - never the
+        # whole cache, which holds every other title too
+        save_path = torrent_streamer.sessions.get(info_hash.lower(), {}).get('save_path') or os.path.join(TORRENT_CACHE_DIR, info_hash.lower())
+        if not os.path.isdir(save_path):
+            raise HTTPException(status_code=404, detail="Video file not found. Stream may still be downloading.")
         video_file = None
         video_extensions = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.ts'}
         
@@ -3979,6 +4901,7 @@ async def stream_video(
         """Stream the video file in chunks with proper range support"""
         chunk_size = 256 * 1024  # 256KB chunks
         bytes_remaining = content_length
+        reader_id = torrent_streamer.open_reader(info_hash, start)
         try:
             with open(video_path, "rb") as f:
                 f.seek(start)
@@ -3988,9 +4911,12 @@ async def stream_video(
                     if not data:
                         break
                     bytes_remaining -= len(data)
+                    torrent_streamer.advance_reader(info_hash, reader_id, end + 1 - bytes_remaining)
                     yield data
         except Exception as e:
             logger.error(f"Direct file stream error for {info_hash[:8]}: {e}")
+        finally:
+            torrent_streamer.close_reader(info_hash, reader_id)
     
     logger.info(f"Direct serving {info_hash[:8]}: {video_path}, range={start}-{end}/{file_size}, type={content_type}")
     
@@ -4517,4 +5443,8 @@ app.add_middleware(
 @app.on_event("shutdown")
 async def shutdown_db_client():
     stop_torrent_server()
+    await flush_progress_buffer()
+    if LIBTORRENT_AVAILABLE and TORRENT_ENGINE_MODE == 'local':
+        await torrent_streamer.flush_resume_data()
+        torrent_streamer.tracker_registry.save()
     client.close()
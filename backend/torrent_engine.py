@@ -0,0 +1,357 @@
+"""
+Host-wide torrent engine.
+
+One process per host owns the libtorrent session (torrent_streaming.TorrentStreamer):
+one DHT, one listen port, one connection budget and one set of torrents
+however many gunicorn workers there are.  Workers use TorrentEngineProxy:
+  - commands (add a torrent, open / advance / close a reader) go one way,
+    in order, as newline-delimited JSON over a Unix socket
+  - state is read from a StatusBoard: a JSON snapshot in shared memory,
+    guarded by a sequence counter, that the engine republishes after each
+    alert pump pass (stamped, so a stale board reads as engine_down)
+
+The V178A leader worker starts it (server.start_torrent_engine):
+    python torrent_engine.py
+A second copy exits at once (flock), and the engine shuts down - saving
+resume data - when the gunicorn master it was started for goes away.  The
+leader's server.engine_watchdog relaunches it if it dies or stops publishing.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import signal
+import struct
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+ENGINE_SOCKET = os.environ.get('TORRENT_ENGINE_SOCKET') or os.path.join(tempfile.gettempdir(), 'privastream_engine.sock')
+ENGINE_BOARD_PATH = os.environ.get('TORRENT_ENGINE_BOARD') or os.path.join(_SHM_DIR, 'privastream_engine_board')
+ENGINE_BOARD_SIZE = 4 * 1024 * 1024
+ENGINE_LOCK_PATH = os.path.join(tempfile.gettempdir(), 'privastream_engine.lock')
+ENGINE_PUBLISH_INTERVAL = 0.25  # seconds between board updates (when something changed)
+ENGINE_ADVANCE_INTERVAL = 0.5  # reader offsets are forwarded at most this often per reader
+ENGINE_HEARTBEAT_TIMEOUT = 10  # a snapshot older than this means the engine is down or hung
+ENGINE_ADD_RETRY = 10  # an add not on the board after this long is sent again
+
+# Commands a worker may send; everything else is rejected
+ENGINE_COMMANDS = ('get_session', 'open_reader', 'advance_reader', 'close_reader', 'cleanup_session')
+
+_HEADER = struct.Struct('<QI')  # sequence (odd while a write is in progress), payload length
+
+
+class StatusBoard:
+    """Single-writer, many-reader JSON snapshot in a shared memory file"""
+
+    def __init__(self, path: str = ENGINE_BOARD_PATH, size: int = ENGINE_BOARD_SIZE, writer: bool = False):
+        self.path = path
+        self.size = size
+        self.writer = writer
+        self._map = None
+        self._seq = 0
+        self._cached_seq = None
+        self._cached: Dict[str, Any] = {}
+        self._last_payload = None
+        if writer:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            self._seq = _HEADER.unpack_from(self._map)[0] & ~1
+
+    def _open(self) -> bool:
+        if self._map is None:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except OSError:
+                return False
+            try:
+                self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return False
+            finally:
+                os.close(fd)
+        return True
+
+    def publish(self, data: dict):
+        payload = json.dumps(data, separators=(',', ':'), default=str).encode()
+        if payload == self._last_payload:
+            return
+        if _HEADER.size + len(payload) > self.size:
+            logger.warning(f"Engine status snapshot too large ({len(payload)} bytes), not published")
+            return
+        self._last_payload = payload
+        self._seq += 1
+        _HEADER.pack_into(self._map, 0, self._seq, 0)
+        self._map[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self._seq += 1
+        _HEADER.pack_into(self._map, 0, self._seq, len(payload))
+
+    def read(self) -> Dict[str, Any]:
+        """Latest consistent snapshot ({} before the engine has published)"""
+        if not self._open():
+            return {}
+        # Runs on the worker's event loop: a few immediate retries, then the
+        # last good snapshot (a write takes microseconds)
+        for _ in range(3):
+            seq, length = _HEADER.unpack_from(self._map)
+            if seq == self._cached_seq:
+                return self._cached
+            if seq & 1 or not length:
+                continue
+            payload = self._map[_HEADER.size:_HEADER.size + length]
+            if _HEADER.unpack_from(self._map)[0] != seq:
+                continue
+            try:
+                self._cached = json.loads(payload)
+                self._cached_seq = seq
+            except ValueError:
+                continue
+            return self._cached
+        return self._cached
+
+
+class EngineClient:
+    """Ordered, fire-and-forget command channel to the engine"""
+
+    def __init__(self, socket_path: str = ENGINE_SOCKET):
+        self.socket_path = socket_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_warning = 0.0
+
+    def send(self, method: str, *args):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=1000)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait(json.dumps({"method": method, "args": args}).encode() + b"\n")
+        except asyncio.QueueFull:
+            self._warn("Engine command queue full, dropping command")
+
+    def _warn(self, message: str):
+        if time.monotonic() - self._last_warning > 30:
+            self._last_warning = time.monotonic()
+            logger.warning(message)
+
+    async def _run(self):
+        writer = None
+        while True:
+            line = await self._queue.get()
+            for attempt in range(2):
+                try:
+                    if writer is None or writer.is_closing():
+                        _, writer = await asyncio.open_unix_connection(self.socket_path)
+                    writer.write(line)
+                    await writer.drain()
+                    break
+                except OSError as e:
+                    writer = None
+                    if attempt:
+                        self._warn(f"Torrent engine unreachable at {self.socket_path}: {e}")
+
+
+class TorrentEngineProxy:
+    """The TorrentStreamer interface request handlers use, backed by the engine"""
+
+    def __init__(self, socket_path: str = ENGINE_SOCKET, board_path: str = ENGINE_BOARD_PATH):
+        self.client = EngineClient(socket_path)
+        self.board = StatusBoard(board_path)
+        self._advance_sent: Dict[str, float] = {}
+        self._add_requested: Dict[str, float] = {}  # {info_hash: monotonic time the add was sent}
+
+    @property
+    def sessions(self) -> Dict[str, dict]:
+        return self.board.read().get('sessions', {})
+
+    @property
+    def download_dir(self) -> Optional[str]:
+        return self.board.read().get('download_dir')
+
+    def engine_alive(self) -> bool:
+        """Whether the engine has published a snapshot recently"""
+        published_at = self.board.read().get('published_at') or 0
+        return time.time() - published_at < ENGINE_HEARTBEAT_TIMEOUT
+    
+    def get_status(self, info_hash: str) -> dict:
+        board = self.board.read()
+        if not self.engine_alive():
+            return {"status": "engine_down", "progress": 0, "peers": 0}
+        data = board.get('sessions', {}).get(info_hash.lower())
+        if data:
+            return data['status']
+        refused = board.get('rejected', {}).get(info_hash.lower())
+        if refused:
+            return {"status": "rejected", "reason": refused['reason'], "progress": 0, "peers": 0}
+        return {"status": "not_found"}
+
+    def add_pending(self, info_hash: str) -> bool:
+        """Whether an add sent by this worker has not reached the board yet"""
+        requested = self._add_requested.get(info_hash.lower())
+        return requested is not None and time.monotonic() - requested < ENGINE_ADD_RETRY
+    
+    def get_session(self, info_hash: str, extra_trackers: list = None):
+        info_hash = info_hash.lower()
+        data = self.sessions.get(info_hash)
+        if data is not None:
+            self._add_requested.pop(info_hash, None)
+            if extra_trackers:
+                self.client.send('get_session', info_hash, extra_trackers)
+        elif not self.add_pending(info_hash):
+            # Status polls re-add missing torrents: one add per ENGINE_ADD_RETRY
+            now = time.monotonic()
+            for stale in [h for h, at in self._add_requested.items() if now - at >= ENGINE_ADD_RETRY]:
+                del self._add_requested[stale]
+            self._add_requested[info_hash] = now
+            self.client.send('get_session', info_hash, extra_trackers)
+        return data
+
+    def cleanup_session(self, info_hash: str):
+        self.client.send('cleanup_session', info_hash)
+
+    def open_reader(self, info_hash: str, offset: int, ttl: Optional[float] = None) -> Optional[str]:
+        reader_id = uuid.uuid4().hex[:8]
+        self.client.send('open_reader', info_hash, offset, reader_id, ttl)
+        return reader_id
+
+    def advance_reader(self, info_hash: str, reader_id: Optional[str], offset: int):
+        if not reader_id:
+            return
+        now = time.monotonic()
+        if now - self._advance_sent.get(reader_id, 0) >= ENGINE_ADVANCE_INTERVAL:
+            self._advance_sent[reader_id] = now
+            self.client.send('advance_reader', info_hash, reader_id, offset)
+
+    def close_reader(self, info_hash: str, reader_id: Optional[str]):
+        if reader_id:
+            self._advance_sent.pop(reader_id, None)
+            self.client.send('close_reader', info_hash, reader_id)
+
+    async def wait_for_metadata(self, info_hash: str, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            data = self.sessions.get(info_hash.lower())
+            if data and data['state']['has_metadata']:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(ENGINE_PUBLISH_INTERVAL)
+
+
+def engine_pid() -> Optional[int]:
+    """PID of the engine holding ENGINE_LOCK_PATH, or None if no engine is running"""
+    try:
+        with open(ENGINE_LOCK_PATH) as lock:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return int(lock.read().strip() or 0) or None
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            return None
+    except (OSError, ValueError):
+        return None
+
+
+# ==================== ENGINE PROCESS ====================
+
+async def _serve_commands(streamer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                command = json.loads(line)
+                if command['method'] not in ENGINE_COMMANDS:
+                    raise ValueError(f"unknown command {command['method']!r}")
+                getattr(streamer, command['method'])(*command['args'])
+            except Exception as e:
+                logger.warning(f"Engine command failed: {e}")
+    finally:
+        writer.close()
+
+
+async def _publish_status(streamer, board: StatusBoard):
+    while True:
+        await asyncio.sleep(ENGINE_PUBLISH_INTERVAL)
+        try:
+            board.publish(dict(streamer.snapshot(), published_at=time.time()))
+        except Exception as e:
+            logger.warning(f"Engine status publish failed: {e}")
+
+
+async def _watch_master(master_pid: int, stop: asyncio.Event):
+    while not stop.is_set():
+        await asyncio.sleep(5)
+        try:
+            os.kill(master_pid, 0)
+        except ProcessLookupError:
+            logger.info(f"Master {master_pid} is gone, stopping torrent engine")
+            stop.set()
+        except PermissionError:
+            pass
+
+
+async def run_engine():
+    # The engine is TorrentStreamer plus its background loops - not the web app
+    import torrent_streaming
+    streamer = torrent_streaming.TorrentStreamer()
+    board = StatusBoard(writer=True)
+    if os.path.exists(ENGINE_SOCKET):
+        os.unlink(ENGINE_SOCKET)
+    rpc = await asyncio.start_unix_server(lambda r, w: _serve_commands(streamer, r, w), path=ENGINE_SOCKET)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    tasks = [
+        asyncio.create_task(torrent_streaming.alert_pump(streamer)),
+        asyncio.create_task(torrent_streaming.piece_scheduler(streamer)),
+        asyncio.create_task(torrent_streaming.admission_controller(streamer)),
+        asyncio.create_task(torrent_streaming.resume_saver(streamer)),
+        asyncio.create_task(torrent_streaming.periodic_cleanup(streamer)),
+        asyncio.create_task(_publish_status(streamer, board)),
+    ]
+    master_pid = int(os.environ.get('TORRENT_ENGINE_MASTER_PID') or 0)
+    if master_pid:
+        tasks.append(asyncio.create_task(_watch_master(master_pid, stop)))
+    logger.info(f"Torrent engine {os.getpid()} serving {ENGINE_SOCKET}")
+
+    await stop.wait()
+    rpc.close()
+    for task in tasks:
+        task.cancel()
+    await streamer.flush_resume_data()
+    streamer.tracker_registry.save()
+    if os.path.exists(ENGINE_SOCKET):
+        os.unlink(ENGINE_SOCKET)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    lock = open(ENGINE_LOCK_PATH, 'a+')
+    try:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        logger.info("A torrent engine is already running on this host")
+        return
+    lock.truncate(0)
+    lock.write(str(os.getpid()))
+    lock.flush()
+    os.environ['TORRENT_ENGINE_MODE'] = 'engine'
+    asyncio.run(run_engine())
+
+
+if __name__ == '__main__':
+    main()
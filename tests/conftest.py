@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep the torrent cache, tracker stats and engine files out of the real ones
+os.environ.setdefault('TORRENT_CACHE_DIR', tempfile.mkdtemp(prefix='privastream-test-cache-'))
+
+# The repo root has an older server.py, and pytest puts the root on sys.path
+# ahead of us when it imports the test modules: load the backend's now
+import server  # noqa: E402,F401
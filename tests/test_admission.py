@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+import torrent_streaming
+from torrent_streaming import STREAM_MIN_BITRATE, TorrentStreamer
+
+
+@pytest.fixture
+def streamer(monkeypatch, tmp_path):
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_MAX_SESSIONS", 3)
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_QUEUE_LIMIT", 1)
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_MIN_FREE_DISK", 0)
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_BANDWIDTH", 0)
+    streamer = TorrentStreamer()
+    streamer.download_dir = str(tmp_path)
+    return streamer
+
+
+def session(age, rate=0, last_read=None, watched=False, admission='admitted'):
+    now = time.time()
+    data = {'created': now - age, 'state': {'progress': 0.1, 'download_rate': rate}, 'admission': admission}
+    if last_read is not None:
+        data['last_read'] = now - last_read
+    if watched:
+        data['readers'] = {'r': {'started': now - 60, 'offset': 0, 'start_offset': 0, 'updated': now}}
+    return data
+
+
+def test_admits_with_headroom(streamer):
+    assert streamer.admit('a') == ('admitted', None)
+
+
+def test_queues_then_rejects_while_a_watched_stream_starves(streamer, monkeypatch):
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_BANDWIDTH", STREAM_MIN_BITRATE)
+    streamer.sessions['w'] = session(100, watched=True)
+    assert streamer.admit('a') == ('queued', "host saturated")
+    streamer.sessions['a'] = session(0, admission='queued')
+    streamer.queue.append('a')
+    assert streamer.admit('b')[0] == 'rejected'
+
+
+def test_idle_sessions_are_evicted_to_make_room(streamer):
+    for name in ('x', 'y', 'z'):
+        streamer.sessions[name] = session(1000, last_read=600)
+    streamer.sessions['z']['last_read'] = time.time() - 900
+    assert streamer.admit('a') == ('admitted', None)
+    assert 'z' not in streamer.sessions
+    assert set(streamer.sessions) == {'x', 'y'}
+
+
+def test_rejects_when_the_disk_is_full(streamer, monkeypatch):
+    monkeypatch.setattr(torrent_streaming, "ADMISSION_MIN_FREE_DISK", float('inf'))
+    monkeypatch.setattr(streamer, "enforce_cache_budget", lambda: None)
+    admission, reason = streamer.admit('a')
+    assert admission == 'rejected' and reason.startswith("disk full")
+
+
+def test_rebalance_pauses_only_the_unwatched_sessions_the_shortfall_needs(streamer):
+    streamer.sessions['w'] = session(100, watched=True)
+    streamer.sessions['old'] = session(250, rate=300 * 1024)
+    streamer.sessions['mid'] = session(200, rate=300 * 1024)
+    streamer.sessions['new'] = session(150, rate=300 * 1024)
+    streamer.rebalance()
+    admissions = {h: d['admission'] for h, d in streamer.sessions.items()}
+    assert admissions == {'w': 'admitted', 'old': 'paused', 'mid': 'paused', 'new': 'admitted'}
+
+
+def test_rebalance_promotes_the_queue_and_resumes_paused_sessions(streamer):
+    streamer.sessions['q'] = session(10, admission='queued')
+    streamer.queue.append('q')
+    streamer.sessions['p'] = session(200, admission='paused')
+    streamer.rebalance()
+    assert streamer.sessions['q']['admission'] == 'admitted'
+    assert streamer.queue == []
+    assert streamer.sessions['p']['admission'] == 'admitted'
+
+
+def test_expired_refusals_are_forgotten(streamer):
+    streamer.rejected['r'] = {'reason': 'disk full', 'at': time.time() - 3600}
+    streamer.rebalance()
+    assert streamer.rejected == {}
+
+
+def test_queued_status_without_a_queue_entry(streamer):
+    streamer.sessions['q'] = session(10, admission='queued')
+    assert streamer.get_status('q')['queue_position'] is None
+    streamer.queue.append('q')
+    assert streamer.get_status('q')['queue_position'] == 1
@@ -0,0 +1,51 @@
+from server import CompactMeta
+
+SERIES = {
+    "id": "tt1",
+    "name": "Show",
+    "genres": ["Drama"],
+    "videos": [
+        {"id": "tt1:1:1", "season": 1, "episode": 1, "name": "Pilot", "released": "2020-01-01"},
+        {"id": "tt1:1:2", "season": 1, "episode": 2, "title": "Second"},
+        {"id": "tt1:2:1", "season": 2, "episode": 1, "thumbnail": "t.jpg", "overview": "Back"},
+    ],
+}
+
+
+def test_full_projection_rebuilds_the_meta():
+    meta = CompactMeta(SERIES, "series").project()
+    assert meta["name"] == "Show" and meta["genres"] == ["Drama"]
+    assert [v["id"] for v in meta["videos"]] == ["tt1:1:1", "tt1:1:2", "tt1:2:1"]
+    assert meta["videos"][0] == {
+        "id": "tt1:1:1", "season": 1, "episode": 1, "name": "Pilot",
+        "thumbnail": None, "overview": None, "released": "2020-01-01",
+    }
+    assert meta["videos"][1]["name"] == "Second"
+    assert "seasons" not in meta
+
+
+def test_season_projection():
+    meta = CompactMeta(SERIES, "series").project(season=2)
+    assert [v["id"] for v in meta["videos"]] == ["tt1:2:1"]
+    assert meta["seasons"] == [1, 2]
+    assert CompactMeta(SERIES, "series").project(season=5)["videos"] == []
+
+
+def test_field_projection():
+    compact = CompactMeta(SERIES, "series")
+    assert compact.project({"name"}) == {"name": "Show"}
+    assert compact.project({"name", "seasons"}) == {"name": "Show", "seasons": [1, 2]}
+    assert len(compact.project({"videos"})["videos"]) == 3
+
+
+def test_movies_are_kept_as_is():
+    movie = {"id": "tt2", "name": "Film", "videos": [{"id": "x"}]}
+    compact = CompactMeta(movie, "movie")
+    assert compact.seasons is None
+    assert compact.project() == movie
+
+
+def test_source_meta_is_not_modified():
+    meta = {"id": "tt1", "name": "Show", "videos": [{"id": "tt1:1:1", "season": 1, "episode": 1}]}
+    CompactMeta(meta, "series").project()
+    assert meta == {"id": "tt1", "name": "Show", "videos": [{"id": "tt1:1:1", "season": 1, "episode": 1}]}
@@ -0,0 +1,65 @@
+from server import build_episode_index, merge_into_episode_index, parse_episode_coverage
+
+
+def test_single_episode():
+    assert parse_episode_coverage("Show.S01E02.1080p.WEB") == {1: {2}}
+
+
+def test_episode_range_and_multi_episode():
+    assert parse_episode_coverage("Show S02E05-E07 720p") == {2: {5, 6, 7}}
+    assert parse_episode_coverage("Show.S01E01E02.HDTV") == {1: {1, 2}}
+
+
+def test_nxm_notation():
+    assert parse_episode_coverage("Show 3x04 HDTV") == {3: {4}}
+
+
+def test_season_packs():
+    assert parse_episode_coverage("Show S01 Complete 1080p") == {1: None}
+    assert parse_episode_coverage("Show Season 2 1080p") == {2: None}
+    assert parse_episode_coverage("Show S01-S03 Pack") == {1: None, 2: None, 3: None}
+
+
+def test_implausible_range_is_one_episode():
+    assert parse_episode_coverage("Show S01E10-E02") == {1: {10}}
+
+
+def test_untagged_title():
+    assert parse_episode_coverage("Some Movie 2019 1080p") == {}
+
+
+def test_build_episode_index():
+    streams = [
+        {"infoHash": "a", "title": "Show S01E01 1080p"},
+        {"infoHash": "b", "title": "Show S01E01-E02 720p"},
+        {"infoHash": "c", "title": "Show S01 Complete"},
+    ]
+    index = build_episode_index(streams)
+    assert [s["infoHash"] for s in index["by_episode"][(1, 1)]] == ["a", "b"]
+    assert [s["infoHash"] for s in index["by_episode"][(1, 2)]] == ["b"]
+    pack = index["packs"][1][0]
+    assert pack["infoHash"] == "c" and pack["seasonPack"] is True and pack["season"] == 1
+    assert index["hashes"] == {"a", "b", "c"}
+
+
+def test_precomputed_coverage_is_used_and_removed():
+    stream = {"infoHash": "a", "title": "no tag here", "_coverage": {4: {9}}}
+    index = build_episode_index([stream])
+    assert index["by_episode"][(4, 9)] == [stream]
+    assert "_coverage" not in stream
+
+
+def test_merge_skips_known_hashes():
+    index = build_episode_index([{"infoHash": "a", "title": "Show S01E01"}])
+    merge_into_episode_index(index, [
+        {"infoHash": "a", "title": "Show S01E01 duplicate"},
+        {"infoHash": "d", "title": "Show S01E03"},
+    ])
+    assert [s["infoHash"] for s in index["streams"]] == ["a", "d"]
+    assert len(index["by_episode"][(1, 1)]) == 1
+    assert (1, 3) in index["by_episode"]
+
+
+def test_custom_title_accessor():
+    index = build_episode_index([{"infoHash": "a", "name": "Show S05E06"}], title_of=lambda s: s["name"])
+    assert (5, 6) in index["by_episode"]
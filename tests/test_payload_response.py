@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+import server
+from server import COMPRESS_MIN_BYTES, CachedPayload, payload_response
+
+LARGE = {"metas": [{"id": f"tt{n}", "name": f"Title {n}"} for n in range(200)]}
+
+
+def request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.replace('_', '-').encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def test_plain_body_and_strong_etag():
+    payload = CachedPayload(LARGE)
+    response = payload_response(request(), payload)
+    assert response.status_code == 200
+    assert json.loads(response.body) == LARGE
+    assert response.headers["etag"] == f'"{payload.digest}"'
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+
+def test_gzip_when_accepted():
+    payload = CachedPayload(LARGE)
+    response = payload_response(request(accept_encoding="gzip, deflate"), payload)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{payload.digest}-gzip"'
+    assert json.loads(gzip.decompress(response.body)) == LARGE
+
+
+def test_refused_encoding_is_not_used():
+    response = payload_response(request(accept_encoding="gzip;q=0"), CachedPayload(LARGE))
+    assert "content-encoding" not in response.headers
+
+
+def test_small_bodies_are_not_compressed():
+    payload = CachedPayload({"ok": True})
+    assert len(payload.body) < COMPRESS_MIN_BYTES
+    response = payload_response(request(accept_encoding="gzip"), payload)
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.skipif(not server.BROTLI_AVAILABLE, reason="brotli not installed")
+def test_brotli_preferred_when_available():
+    payload = CachedPayload(LARGE)
+    response = payload_response(request(accept_encoding="gzip, br"), payload)
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(server.brotli.decompress(response.body)) == LARGE
+
+
+def test_matching_etag_gets_304_for_any_encoding():
+    payload = CachedPayload(LARGE)
+    for if_none_match in (f'"{payload.digest}"', f'W/"{payload.digest}-gzip"', f'"other", "{payload.digest}-gzip"', "*"):
+        response = payload_response(request(if_none_match=if_none_match, accept_encoding="gzip"), payload)
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == f'"{payload.digest}-gzip"'
+
+
+def test_changed_payload_is_sent_again():
+    old = CachedPayload({"metas": []})
+    response = payload_response(request(if_none_match=old.etag()), CachedPayload(LARGE))
+    assert response.status_code == 200
+
+
+def test_encodings_are_built_once():
+    payload = CachedPayload(LARGE)
+    assert payload.encoded("gzip") is payload.encoded("gzip")
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import server
+from server import race_variants
+
+
+@pytest.fixture(autouse=True)
+def fresh_winners(monkeypatch):
+    monkeypatch.setattr(server, "_variant_winners", server.OrderedDict())
+
+
+def variant(result, delay=0.0, calls=None, name=None):
+    async def run():
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return run
+
+
+def test_first_non_empty_result_wins_and_is_remembered():
+    variants = [("slow", variant(["slow"], 0.2)), ("fast", variant(["fast"], 0.0))]
+    assert asyncio.run(race_variants("k", variants, stagger=0.01)) == ["fast"]
+    assert server._variant_winners["k"]["variant"] == "fast"
+
+
+def test_remembered_winner_launches_first():
+    calls = []
+    variants = [("a", variant(["a"], calls=calls, name="a")), ("b", variant(["b"], calls=calls, name="b"))]
+    asyncio.run(race_variants("k", variants[::-1], stagger=1.0))
+    assert calls == ["b"]
+    calls.clear()
+    assert asyncio.run(race_variants("k", variants, stagger=1.0)) == ["b"]
+    assert calls == ["b"]
+
+
+def test_empty_results_move_on_without_waiting_out_the_stagger():
+    variants = [("empty", variant([])), ("full", variant(["x"]))]
+    loop_time = []
+
+    async def timed():
+        start = asyncio.get_running_loop().time()
+        result = await race_variants("k", variants, stagger=5.0)
+        loop_time.append(asyncio.get_running_loop().time() - start)
+        return result
+
+    assert asyncio.run(timed()) == ["x"]
+    assert loop_time[0] < 1.0
+
+
+def test_all_empty_is_empty_list_and_no_answer_is_none():
+    assert asyncio.run(race_variants("k", [("a", variant([])), ("b", variant(None))], stagger=0.01)) == []
+    failing = [("a", variant(RuntimeError("down"))), ("b", variant(None))]
+    assert asyncio.run(race_variants("k", failing, stagger=0.01)) is None
+
+
+def test_losers_are_cancelled():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        result = await race_variants("k", [("slow", slow), ("fast", variant(["x"], 0.05))], stagger=0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ["x"]
+    assert cancelled == [True]
+
+
+def test_winners_are_evicted_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(server, "VARIANT_WINNERS_MAX", 2)
+
+    async def run():
+        await race_variants("old", [("a", variant(["a"]))])
+        await race_variants("kept", [("a", variant(["a"]))])
+        await race_variants("old", [("a", variant(["a"]))])  # used again: now the newest
+        await race_variants("new", [("a", variant(["a"]))])
+
+    asyncio.run(run())
+    assert list(server._variant_winners) == ["old", "new"]
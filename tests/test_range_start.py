@@ -0,0 +1,25 @@
+from server import _range_start
+
+VIDEO = {"size": 1000}
+
+
+def test_no_range_starts_at_zero():
+    assert _range_start(None) == 0
+    assert _range_start("") == 0
+
+
+def test_open_and_closed_ranges():
+    assert _range_start("bytes=500-") == 500
+    assert _range_start("bytes=200-299") == 200
+    assert _range_start("bytes=100-199, 400-499") == 100
+
+
+def test_suffix_range_needs_the_file_size():
+    assert _range_start("bytes=-300", VIDEO) == 700
+    assert _range_start("bytes=-5000", VIDEO) == 0
+    assert _range_start("bytes=-300") is None
+
+
+def test_malformed_ranges_are_unknown():
+    assert _range_start("bytes=abc-") is None
+    assert _range_start("bytes=-x", VIDEO) is None
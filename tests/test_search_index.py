@@ -0,0 +1,77 @@
+import pytest
+
+from server import SearchIndex
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add_many([
+        {"id": "tt1", "name": "Stranger Things", "type": "series"},
+        {"id": "tt2", "name": "The Thing", "type": "movie", "releaseInfo": "1982", "genres": ["Horror"]},
+        {"id": "tt3", "name": "Things We Lost in the Fire", "type": "movie"},
+        {"id": "tt4", "name": "Interstellar", "type": "movie"},
+    ])
+    return index
+
+
+def ranked(results):
+    return [(meta["id"], score) for meta, score in results]
+
+
+def test_exact_name_scores_highest(index):
+    assert ranked(index.search("stranger things")) == [("tt1", 100)]
+    assert ranked(index.search("the thing"))[0] == ("tt2", 100)
+
+
+def test_prefix_of_the_last_word_matches_while_typing(index):
+    assert ranked(index.search("strang")) == [("tt1", 95)]
+    assert ranked(index.search("interst")) == [("tt4", 95)]
+
+
+def test_name_prefix_beats_name_containing_the_query(index):
+    scores = dict(ranked(index.search("thing")))
+    assert scores["tt3"] == 95
+    assert scores["tt1"] == scores["tt2"] == 90
+
+
+def test_typos_match_below_exact_and_prefix_scores(index):
+    results = ranked(index.search("interstelar"))
+    assert [cid for cid, _ in results] == ["tt4"]
+    assert results[0][1] < 90
+    assert [cid for cid, _ in ranked(index.search("strnger thi"))] == ["tt1"]
+
+
+def test_every_significant_word_must_match(index):
+    assert index.search("stranger fire") == []
+    assert index.search("xyz") == []
+
+
+def test_filters(index):
+    assert [cid for cid, _ in ranked(index.search("thing", content_type="series"))] == ["tt1"]
+    assert [cid for cid, _ in ranked(index.search("thing", year=1982))] == ["tt2"]
+    assert [cid for cid, _ in ranked(index.search("thing", genre="horror"))] == ["tt2"]
+
+
+def test_renamed_meta_is_reindexed(index):
+    index.add({"id": "tt4", "name": "Arrival", "type": "movie"})
+    assert index.search("interstellar") == []
+    assert ranked(index.search("arrival")) == [("tt4", 100)]
+    assert "interstellar" not in index.words
+
+
+def test_oldest_entry_is_evicted_at_capacity():
+    index = SearchIndex(max_entries=2)
+    for n, name in enumerate(("Alpha", "Bravo", "Charlie")):
+        index.add({"id": f"tt{n}", "name": name, "type": "movie"})
+    assert len(index) == 2
+    assert index.search("alpha") == []
+    assert "alpha" not in index.words
+    assert ranked(index.search("charlie")) == [("tt2", 100)]
+
+
+def test_non_titles_are_ignored():
+    index = SearchIndex()
+    index.add({"id": "tt1", "name": "Channel", "type": "tv"})
+    index.add({"id": "tt2", "type": "movie"})
+    assert len(index) == 0
@@ -0,0 +1,75 @@
+import pytest
+
+from torrent_engine import _HEADER, StatusBoard
+
+
+@pytest.fixture
+def boards(tmp_path):
+    path = str(tmp_path / "board")
+    writer = StatusBoard(path, size=4096, writer=True)
+    return writer, StatusBoard(path, size=4096)
+
+
+def test_reader_before_the_engine_publishes(tmp_path):
+    assert StatusBoard(str(tmp_path / "missing")).read() == {}
+
+
+def test_reader_sees_each_publish(boards):
+    writer, reader = boards
+    writer.publish({"sessions": {"a": 1}})
+    assert reader.read() == {"sessions": {"a": 1}}
+    writer.publish({"sessions": {"a": 2}})
+    assert reader.read() == {"sessions": {"a": 2}}
+
+
+def test_unchanged_sequence_reuses_the_parsed_snapshot(boards):
+    writer, reader = boards
+    writer.publish({"n": 1})
+    assert reader.read() is reader.read()
+
+
+def test_identical_snapshots_are_not_republished(boards):
+    writer, _ = boards
+    writer.publish({"n": 1})
+    seq = _HEADER.unpack_from(writer._map)[0]
+    writer.publish({"n": 1})
+    assert _HEADER.unpack_from(writer._map)[0] == seq
+
+
+def test_write_in_progress_returns_the_last_good_snapshot(boards):
+    writer, reader = boards
+    writer.publish({"n": 1})
+    assert reader.read() == {"n": 1}
+    seq, length = _HEADER.unpack_from(writer._map)
+    # An odd sequence marks a write under way, with the payload half replaced
+    _HEADER.pack_into(writer._map, 0, seq + 1, length)
+    writer._map[_HEADER.size:_HEADER.size + 3] = b"gar"
+    assert reader.read() == {"n": 1}
+    writer.publish({"n": 2})
+    assert reader.read() == {"n": 2}
+
+
+def test_torn_payload_is_never_returned(boards):
+    writer, reader = boards
+    writer.publish({"n": 1})
+    seq, length = _HEADER.unpack_from(writer._map)
+    # Same (even) sequence as a snapshot the reader never parsed, but unparseable
+    writer._map[_HEADER.size:_HEADER.size + 1] = b"x"
+    _HEADER.pack_into(writer._map, 0, seq + 2, length)
+    assert reader.read() == {}
+
+
+def test_oversized_snapshot_is_not_published(boards):
+    writer, reader = boards
+    writer.publish({"n": 1})
+    writer.publish({"blob": "x" * 8192})
+    assert reader.read() == {"n": 1}
+
+
+def test_writer_resumes_an_existing_sequence(tmp_path):
+    path = str(tmp_path / "board")
+    StatusBoard(path, size=4096, writer=True).publish({"n": 1})
+    restarted = StatusBoard(path, size=4096, writer=True)
+    assert restarted._seq == 2
+    restarted.publish({"n": 2})
+    assert StatusBoard(path, size=4096).read() == {"n": 2}
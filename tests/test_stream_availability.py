@@ -0,0 +1,45 @@
+import pytest
+
+import server
+from server import AVAILABILITY_ZERO_CONFIRMATIONS, record_stream_availability
+
+
+@pytest.fixture(autouse=True)
+def memory_only(monkeypatch):
+    """Fresh availability cache; the Mongo write is dropped (no database here)"""
+    monkeypatch.setattr(server, "_availability_cache", {})
+    monkeypatch.setattr(server, "spawn_background", lambda coro: coro.close())
+
+
+def count(content_id):
+    return server._availability_cache[content_id]["count"]
+
+
+def test_unknown_title_records_zero_at_once():
+    record_stream_availability("movie", "tt1", 0)
+    assert count("tt1") == 0
+
+
+def test_positive_count_needs_confirmed_zeros():
+    record_stream_availability("movie", "tt1", 5)
+    for _ in range(AVAILABILITY_ZERO_CONFIRMATIONS - 1):
+        record_stream_availability("movie", "tt1", 0)
+        assert count("tt1") == 5
+    record_stream_availability("movie", "tt1", 0)
+    assert count("tt1") == 0
+
+
+def test_a_positive_result_resets_the_zero_streak():
+    record_stream_availability("movie", "tt1", 5)
+    record_stream_availability("movie", "tt1", 0)
+    record_stream_availability("movie", "tt1", 3)
+    record_stream_availability("movie", "tt1", 0)
+    assert count("tt1") == 3
+
+
+def test_series_are_keyed_by_show_and_never_zeroed_by_an_episode():
+    record_stream_availability("series", "tt9:1:1", 4)
+    assert count("tt9") == 4
+    for _ in range(AVAILABILITY_ZERO_CONFIRMATIONS + 2):
+        record_stream_availability("series", "tt9:3:7", 0)
+    assert count("tt9") == 4
@@ -0,0 +1,66 @@
+import pytest
+
+import torrent_streaming
+from torrent_streaming import TRACKER_DEAD_FAILURES, TrackerRegistry, normalize_tracker_url
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return TrackerRegistry([
+        "http://a.example/announce",
+        "HTTP://B.Example/announce/",
+        "http://a.example/announce/",
+        "not a tracker",
+    ], path=str(tmp_path / "trackers.json"))
+
+
+def test_normalize_tracker_url():
+    assert normalize_tracker_url(" UDP://Tracker.Example:6969/announce/ ") == "udp://tracker.example:6969/announce"
+    assert normalize_tracker_url("wss://tracker.example") is None
+    assert normalize_tracker_url(None) is None
+
+
+def test_seeds_are_normalized_and_deduplicated(registry):
+    assert registry.seeds == ["http://a.example/announce", "http://b.example/announce"]
+
+
+def test_unknown_trackers_keep_their_order_and_extras_follow(registry):
+    tiers = registry.tiers(["http://c.example/announce", "http://A.example/announce"])
+    assert [url for url, _ in tiers] == [
+        "http://a.example/announce", "http://b.example/announce", "http://c.example/announce",
+    ]
+
+
+def test_healthy_trackers_rank_first(registry):
+    for _ in range(5):
+        registry.record_reply("http://b.example/announce", latency=0.1)
+    registry.record_error("http://a.example/announce")
+    assert [url for url, _ in registry.tiers()] == ["http://b.example/announce", "http://a.example/announce"]
+
+
+def test_slow_trackers_rank_below_fast_ones(registry):
+    registry.record_reply("http://a.example/announce", latency=1.5)
+    registry.record_reply("http://b.example/announce", latency=0.05)
+    assert registry.tiers()[0][0] == "http://b.example/announce"
+
+
+def test_only_the_top_trackers_get_tier_zero(registry, monkeypatch):
+    monkeypatch.setattr(torrent_streaming, "TRACKER_TOP_N", 1)
+    assert registry.tiers(["http://c.example/announce"]) == [
+        ("http://a.example/announce", 0), ("http://b.example/announce", 1), ("http://c.example/announce", 1),
+    ]
+
+
+def test_dead_trackers_are_left_out_until_they_answer(registry):
+    for _ in range(TRACKER_DEAD_FAILURES):
+        registry.record_error("http://a.example/announce")
+    assert [url for url, _ in registry.tiers()] == ["http://b.example/announce"]
+    registry.record_reply("http://a.example/announce")
+    assert "http://a.example/announce" in dict(registry.tiers())
+
+
+def test_stats_survive_a_restart(registry):
+    registry.record_reply("http://b.example/announce")
+    registry.save()
+    reloaded = TrackerRegistry(registry.seeds, path=registry.path)
+    assert reloaded.stats["http://b.example/announce"]["ok"] == 1
@@ -37,6 +37,11 @@ const engines = {};
 const ENGINE_TIMEOUT = 30 * 60 * 1000; // 30 min idle = destroy (increased for safety)
 const STREAM_TIMEOUT = 30 * 1000; // 30s stream inactivity
 
+// torrent-stream caches fetched metadata as <tmp>/<name>/<infoHash>.torrent and
+// adds from that file next time instead of waiting on peers for it. The Python
+// backend reads and writes the same store (TORRENT_METADATA_DIR in server.py).
+const METADATA_DIR = process.env.TORRENT_METADATA_DIR || path.join(os.tmpdir(), 'torrent-stream');
+
 // Default tracker list - comprehensive for maximum peer discovery
 // IMPORTANT: HTTP trackers work in K8s environments where UDP is blocked
 const DEFAULT_TRACKERS = [
@@ -123,6 +128,8 @@ function createEngine(infoHash, options = {}) {
     connections: 200, // Max peers
     uploads: 5,      // Low uploads to maximize download bandwidth
     verify: true,
+    tmp: path.dirname(METADATA_DIR),
+    name: path.basename(METADATA_DIR),
     id: generatePeerId(),
     // Pass ALL trackers directly to the engine
     trackers: [...DEFAULT_TRACKERS],